@@ -4,22 +4,271 @@ Implements semantic search, query parsing, and intelligent result formatting.
 """
 
 import os
+import hashlib
+import importlib.util
 import json
 import re
-from typing import List, Dict, Any, Optional, Tuple
+import sys
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Hashable, Optional, Tuple
 from datetime import datetime, timedelta
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 from dateutil.parser import parse as parse_date
+from dateutil.relativedelta import relativedelta
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 
-# AI/ML imports
-try:
-    import openai
-    from sentence_transformers import SentenceTransformer
-    AI_AVAILABLE = True
-except ImportError:
-    AI_AVAILABLE = False
+from embedding_store import EmbeddingCache, PersistentEmbeddingStore, embedding_key
+from ann_index import IVFIndex
+from bm25_index import BM25Index
+from slack_cache import user_directory
+from metrics import STAGE_SECONDS, OPENAI_REQUEST_SECONDS, OPENAI_REQUESTS, ENCODED_TEXTS
+
+# AI/ML packages are imported on first use; importing torch alone takes seconds
+AI_AVAILABLE = all(
+    importlib.util.find_spec(package) is not None
+    for package in ('openai', 'sentence_transformers')
+)
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a query for cache lookups: case, spacing and trailing punctuation are ignored."""
+    query = unicodedata.normalize('NFKC', query).casefold()
+    query = re.sub(r'\s+', ' ', query).strip()
+    return query.rstrip('?!.').strip()
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry expiry, optionally persisted to a JSON file."""
+    
+    def __init__(self, max_size: int = 1024, ttl: float = 86400.0, path: Optional[str] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = path
+        self._entries: 'OrderedDict[str, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    for key, expires_at, value in json.load(f):
+                        self._entries[key] = (expires_at, value)
+            except Exception as e:
+                print(f"Warning: Could not load cache {path}: {e}", file=sys.stderr)
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.time():
+                self._entries.pop(key, None)
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry[1]
+    
+    def put(self, key: str, value: Any):
+        """Store a JSON-serializable value, evicting the least recently used entry when full."""
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            if self.path:
+                self._save()
+    
+    def _save(self):
+        """Write entries atomically. Caller holds the lock."""
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump([[key, expires_at, value] for key, (expires_at, value) in self._entries.items()], f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Warning: Could not save cache {self.path}: {e}", file=sys.stderr)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and size."""
+        with self._lock:
+            return dict(self.stats, size=len(self._entries))
+
+def reciprocal_rank_fusion(rankings: List[List[Hashable]], k: int = 60) -> List[Tuple[Hashable, float]]:
+    """Fuse ranked lists: each item scores the sum of 1 / (k + rank) over the lists it appears in."""
+    scores: Dict[Hashable, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, 1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+_TIME_UNITS = {
+    'minute': 'minutes', 'hour': 'hours', 'day': 'days', 'week': 'weeks',
+    'month': 'months', 'year': 'years',
+}
+
+_WEEKDAY = re.compile(r'\b(?:mon|tue|wed|thu|fri|sat|sun)[a-z]*\b')
+_MONTH_OR_DAY = re.compile(r'\b(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\b|\d+(?:st|nd|rd|th)\b|\d+[/.-]\d+')
+
+def _previous_period(parsed: datetime, text: str) -> datetime:
+    """
+    Move a date without an explicit year back one period: dateutil fills the
+    missing parts forward from now, but filters refer to the past.
+    """
+    if _MONTH_OR_DAY.search(text):
+        return parsed - relativedelta(years=1)
+    if _WEEKDAY.search(text):
+        return parsed - timedelta(weeks=1)
+    return parsed - timedelta(days=1)
+
+_FIXED_RANGES = {
+    'yesterday': lambda now, midnight: (now - timedelta(days=1), None),
+    'today': lambda now, midnight: (midnight, None),
+    'last week': lambda now, midnight: (now - timedelta(weeks=1), None),
+    'past week': lambda now, midnight: (now - timedelta(weeks=1), None),
+    'this week': lambda now, midnight: (now - timedelta(days=now.weekday()), None),
+    'last month': lambda now, midnight: (now - timedelta(days=30), None),
+    'past month': lambda now, midnight: (now - timedelta(days=30), None),
+    'this month': lambda now, midnight: (midnight.replace(day=1), None),
+    'last year': lambda now, midnight: (now - relativedelta(years=1), None),
+    'past year': lambda now, midnight: (now - relativedelta(years=1), None),
+    'this year': lambda now, midnight: (midnight.replace(month=1, day=1), None),
+}
+
+_NAMED_DAYS = {'today': 0, 'yesterday': 1}
+
+def _parse_bound(text: str, now: datetime, roll_back: bool = True) -> Tuple[datetime, Optional[relativedelta]]:
+    """
+    Parse one end of a range. Returns the datetime and the period it names
+    (a day, month or year), or None when it names an exact time.
+    Missing parts default to the start of the period ("march" is March 1,
+    "2025" is January 1). With roll_back, a date after now with no explicit
+    year ("monday", "December 1") is moved back to its previous occurrence.
+    """
+    text = text.strip()
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    day = relativedelta(days=1)
+    if text == 'now':
+        return now, None
+    if text in _NAMED_DAYS:
+        return midnight - timedelta(days=_NAMED_DAYS[text]), day
+    
+    match = re.fullmatch(r'last\s+(' + _WEEKDAY.pattern + ')', text)
+    if match:
+        # dateutil resolves a weekday to its next occurrence from today
+        parsed = parse_date(match.group(1), default=midnight)
+        if parsed >= midnight:
+            parsed -= timedelta(weeks=1)
+        return parsed, day
+    
+    has_year = re.search(r'\b\d{4}\b', text)
+    span = day
+    if _WEEKDAY.search(text):
+        parsed = parse_date(text, default=midnight)
+    else:
+        # Parse with two different defaults to find which parts the text leaves out
+        first = parse_date(text, default=midnight.replace(month=1, day=1))
+        second = parse_date(text, default=midnight.replace(month=12, day=28))
+        month_missing = first.month != second.month
+        day_missing = first.day != second.day
+        if day_missing and month_missing and has_year:
+            parsed, span = first, relativedelta(years=1)
+        elif day_missing and not month_missing:
+            parsed, span = first, relativedelta(months=1)
+        else:
+            parsed = parse_date(text, default=midnight)
+    if parsed.hour or parsed.minute or parsed.second:
+        span = None
+    if roll_back and parsed > now and not has_year:
+        parsed = _previous_period(parsed, text)
+    return parsed, span
+
+def parse_time_range(time_filter: str, now: Optional[datetime] = None) -> Optional[Tuple[Optional[datetime], Optional[datetime]]]:
+    """
+    Turn a time filter phrase into a [start, end) range; either bound may be None.
+    Understands the fixed phrases ("yesterday", "last week", ...), relative spans
+    ("last 3 days", "2 hours ago"), open ranges ("since March", "before 2024-05-01")
+    and absolute ranges ("between monday and today", "last friday", or a single date).
+    Returns None when the phrase is not recognised.
+    """
+    if not time_filter:
+        return None
+    now = now or datetime.now()
+    text = re.sub(r'^(?:in|during|over)\s+(?:the\s+)?', '', time_filter.lower().strip())
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    
+    if text in _FIXED_RANGES:
+        return _FIXED_RANGES[text](now, midnight)
+    
+    try:
+        match = re.fullmatch(r'(?:last|past)\s+(\d+)\s+(minute|hour|day|week|month|year)s?', text)
+        if match:
+            return now - relativedelta(**{_TIME_UNITS[match.group(2)]: int(match.group(1))}), None
+        
+        match = re.fullmatch(r'(\d+)\s+(minute|hour|day|week|month|year)s?\s+ago', text)
+        if match:
+            unit = relativedelta(**{_TIME_UNITS[match.group(2)]: 1})
+            span = relativedelta(**{_TIME_UNITS[match.group(2)]: int(match.group(1))})
+            # Minutes and hours count back from now, longer units from the start of today
+            start = (now if match.group(2) in ('minute', 'hour') else midnight) - span
+            return start, start + unit
+        
+        match = re.fullmatch(r'(?:between|from)\s+(.+?)\s+(?:and|to|until)\s+(.+)', text)
+        if match:
+            start, _ = _parse_bound(match.group(1), now)
+            end, span = _parse_bound(match.group(2), now, roll_back=False)
+            # Roll the end back too unless that would put it before the start ("from Oct 10 to Oct 25")
+            if end > now and not re.search(r'\b\d{4}\b', match.group(2)):
+                earlier = _previous_period(end, match.group(2))
+                if earlier >= start:
+                    end = earlier
+            return start, end + span if span else end
+        
+        match = re.fullmatch(r'(?:since|after)\s+(.+)', text)
+        if match:
+            return _parse_bound(match.group(1), now)[0], None
+        
+        match = re.fullmatch(r'(?:before|until)\s+(.+)', text)
+        if match:
+            # A future end bound already covers everything up to now
+            end, span = _parse_bound(match.group(1), now, roll_back=False)
+            if text.startswith('until') and span:
+                end += span
+            return None, end
+        
+        # A single date covers the whole day, month or year it names
+        start, span = _parse_bound(text, now)
+        return start, start + span if span else None
+    except (ValueError, OverflowError):
+        return None
+
+class MessageBatch:
+    """Columnar view of messages: a float64 timestamp array alongside the message objects."""
+    
+    def __init__(self, messages: List[Dict]):
+        self.messages = messages
+        self.ts = np.array([self._ts(msg) for msg in messages], dtype=np.float64)
+    
+    @staticmethod
+    def _ts(msg: Dict) -> float:
+        try:
+            return float(msg.get('ts', 'nan'))
+        except (TypeError, ValueError):
+            return float('nan')
+    
+    def time_mask(self, start: Optional[datetime], end: Optional[datetime]) -> np.ndarray:
+        """Boolean mask of messages with start <= ts < end; messages without a valid ts never match."""
+        mask = ~np.isnan(self.ts)
+        if start is not None:
+            mask &= self.ts >= start.timestamp()
+        if end is not None:
+            mask &= self.ts < end.timestamp()
+        return mask
+    
+    def select(self, mask: np.ndarray) -> List[Dict]:
+        """Return the messages where mask is True, in their original order."""
+        return [self.messages[i] for i in np.flatnonzero(mask)]
 
 @dataclass
 class SearchParams:
@@ -45,31 +294,145 @@ class NaturalLanguageSearchEngine:
     """AI-powered search engine for Slack messages."""
     
     def __init__(self):
-        self.openai_client = None
-        self.embedding_model = None
-        self.embeddings_cache = {}
+        self._openai_client = None
+        self._embedding_model = None
+        # Component readiness: 'not loaded', 'loading', 'ready', 'disabled' or 'failed'
+        self.component_status = {'llm': 'not loaded', 'embedding_model': 'not loaded'}
+        if not AI_AVAILABLE:
+            self.component_status = {'llm': 'disabled', 'embedding_model': 'disabled'}
+        self._load_lock = threading.Lock()
+        self._warmup_thread = None
+        
+        # Parsed LLM queries keyed by normalized text; time filters stay relative phrases
+        self.query_cache = TTLCache(
+            max_size=int(os.getenv('QUERY_CACHE_SIZE', '1024')),
+            ttl=float(os.getenv('QUERY_CACHE_TTL', '86400')),
+            path=os.getenv('QUERY_CACHE_PATH') or None,
+        )
+        
+        # LLM summaries keyed by a fingerprint of the query and the summarized messages
+        self.summary_cache = TTLCache(
+            max_size=int(os.getenv('SUMMARY_CACHE_SIZE', '256')),
+            ttl=float(os.getenv('SUMMARY_CACHE_TTL', '3600')),
+        )
+        
+        self.embeddings_cache = EmbeddingCache(
+            max_bytes=int(float(os.getenv('EMBEDDING_CACHE_MB', '64')) * 1024 * 1024),
+            dtype=os.getenv('EMBEDDING_CACHE_DTYPE', 'float16'),
+        )
         
-        # Initialize AI components if available
-        if AI_AVAILABLE:
-            self._init_ai_components()
+        # On-disk embeddings survive restarts; set EMBEDDING_STORE_DIR to an empty string to disable.
+        # EMBEDDING_STORAGE_DTYPE (int8, float16 or float32) applies to new stores and the ANN index
+        store_dir = os.getenv('EMBEDDING_STORE_DIR', os.path.expanduser('~/.slack-mcp-server/embeddings'))
+        storage_dtype = os.getenv('EMBEDDING_STORAGE_DTYPE', 'int8')
+        self.embedding_store = None
+        if store_dir:
+            try:
+                self.embedding_store = PersistentEmbeddingStore(store_dir, dtype=storage_dtype)
+            except Exception as e:
+                print(f"Warning: Could not open embedding store: {e}", file=sys.stderr)
+        
+        # Large candidate sets are ranked through the ANN index; ANN_NPROBE trades recall for latency
+        self.ann_min_candidates = int(os.getenv('ANN_MIN_CANDIDATES', '5000'))
+        self.ann_index = IVFIndex(
+            path=os.path.join(store_dir, 'ann_index.npz') if store_dir else None,
+            nprobe=int(os.getenv('ANN_NPROBE', '16')),
+            dtype=storage_dtype,
+        )
+        
+        # Keyword ranking index, extended with each search's unseen messages
+        self.bm25_index = BM25Index()
+        
+        # Hybrid mode fuses BM25 and vector candidates and reranks only the fused pool;
+        # SEARCH_MODE=semantic scores every candidate with embeddings instead
+        self.search_mode = os.getenv('SEARCH_MODE', 'hybrid')
+        self.hybrid_candidates = int(os.getenv('HYBRID_CANDIDATES', '50'))
+        self.hybrid_embed_budget = int(os.getenv('HYBRID_EMBED_BUDGET', '512'))
+        self.rrf_k = int(os.getenv('RRF_K', '60'))
+        self._retrieval_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='retrieval')
+        
+    @property
+    def openai_client(self):
+        """OpenAI client, created on first use."""
+        if self.component_status['llm'] in ('not loaded', 'loading'):
+            self._load_openai_client()
+        return self._openai_client
     
-    def _init_ai_components(self):
-        """Initialize AI components (OpenAI, embeddings)."""
-        try:
-            # Initialize OpenAI client
+    @openai_client.setter
+    def openai_client(self, client):
+        self._openai_client = client
+        self.component_status['llm'] = 'ready' if client else 'disabled'
+    
+    @property
+    def embedding_model(self):
+        """SentenceTransformer model, loaded on first use."""
+        if self.component_status['embedding_model'] in ('not loaded', 'loading'):
+            self._load_embedding_model()
+        return self._embedding_model
+    
+    @embedding_model.setter
+    def embedding_model(self, model):
+        self._embedding_model = model
+        self.component_status['embedding_model'] = 'ready' if model else 'disabled'
+    
+    def _load_openai_client(self):
+        """Import openai and create the client if an API key is configured."""
+        with self._load_lock:
+            if self.component_status['llm'] not in ('not loaded', 'loading'):
+                return
             api_key = os.getenv('OPENAI_API_KEY')
-            if api_key:
-                self.openai_client = openai.OpenAI(api_key=api_key)
-            
-            # Initialize local embedding model as fallback
+            if not api_key:
+                self.component_status['llm'] = 'disabled'
+                return
+            self.component_status['llm'] = 'loading'
             try:
-                self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+                import openai
+                self._openai_client = openai.OpenAI(api_key=api_key)
+                self.component_status['llm'] = 'ready'
             except Exception as e:
-                print(f"Warning: Could not load embedding model: {e}")
-                
-        except Exception as e:
-            print(f"Warning: AI initialization failed: {e}")
+                print(f"Warning: AI initialization failed: {e}", file=sys.stderr)
+                self.component_status['llm'] = 'failed'
+    
+    def _load_embedding_model(self):
+        """Import sentence-transformers and load the local embedding model."""
+        with self._load_lock:
+            if self.component_status['embedding_model'] not in ('not loaded', 'loading'):
+                return
+            self.component_status['embedding_model'] = 'loading'
+            try:
+                from sentence_transformers import SentenceTransformer
+                self._embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+                self.component_status['embedding_model'] = 'ready'
+            except Exception as e:
+                print(f"Warning: Could not load embedding model: {e}", file=sys.stderr)
+                self.component_status['embedding_model'] = 'failed'
+    
+    def start_warmup(self) -> Optional[threading.Thread]:
+        """Load AI components in a background thread so the first search does not pay for it."""
+        if not AI_AVAILABLE or self._warmup_thread is not None:
+            return self._warmup_thread
+        
+        def warmup():
+            self._load_openai_client()
+            self._load_embedding_model()
+        
+        self._warmup_thread = threading.Thread(target=warmup, name='ai-warmup', daemon=True)
+        self._warmup_thread.start()
+        return self._warmup_thread
+    
+    def is_ready(self) -> bool:
+        """True once no AI component is still waiting to be loaded."""
+        return all(status not in ('not loaded', 'loading') for status in self.component_status.values())
+    
+    def readiness(self) -> str:
+        """Describe load progress: 'ready', 'warming up', or 'loads on first use' when no warm-up was started."""
+        if self.is_ready():
+            return 'ready'
+        if self._warmup_thread is None and 'loading' not in self.component_status.values():
+            return 'loads on first use'
+        return 'warming up'
     
+    @STAGE_SECONDS.time(stage='parse_query')
     def parse_natural_query(self, query: str) -> SearchParams:
         """Parse natural language query into structured search parameters."""
         
@@ -78,8 +441,24 @@ class NaturalLanguageSearchEngine:
         else:
             return self._parse_with_rules(query)
     
+    def _chat_completion(self, operation: str, **kwargs):
+        """Call the chat completions API, recording latency and outcome under operation."""
+        with OPENAI_REQUEST_SECONDS.time(operation=operation):
+            try:
+                response = self.openai_client.chat.completions.create(**kwargs)
+            except Exception:
+                OPENAI_REQUESTS.inc(operation=operation, outcome='error')
+                raise
+        OPENAI_REQUESTS.inc(operation=operation, outcome='ok')
+        return response
+    
     def _parse_with_llm(self, query: str) -> SearchParams:
-        """Use LLM to parse natural language query."""
+        """Use LLM to parse natural language query, reusing cached parses of the same normalized query."""
+        
+        cache_key = normalize_query(query)
+        cached = self.query_cache.get(cache_key)
+        if cached is not None:
+            return SearchParams(**cached)
         
         prompt = f"""
         Parse this Slack search query and extract structured search parameters:
@@ -95,11 +474,13 @@ class NaturalLanguageSearchEngine:
             "channel_hints": ["channel-name"] or []
         }}
         
+        Keep time_filter as the relative phrase from the query; never convert it to a date.
         Return ONLY the JSON, no other text.
         """
         
         try:
-            response = self.openai_client.chat.completions.create(
+            response = self._chat_completion(
+                'parse_query',
                 model="gpt-3.5-turbo",
                 messages=[{"role": "user", "content": prompt}],
                 max_tokens=200,
@@ -111,7 +492,11 @@ class NaturalLanguageSearchEngine:
             json_str = re.sub(r'^```json\s*', '', json_str)
             json_str = re.sub(r'\s*```$', '', json_str)
             
-            return SearchParams.from_json(json_str)
+            search_params = SearchParams.from_json(json_str)
+            # from_json falls back to the raw reply when it is not valid JSON; don't cache that
+            if search_params.keywords != [json_str]:
+                self.query_cache.put(cache_key, asdict(search_params))
+            return search_params
             
         except Exception as e:
             print(f"LLM parsing failed: {e}")
@@ -129,6 +514,8 @@ class NaturalLanguageSearchEngine:
         
         # Extract time references
         time_patterns = {
+            r'((?:last|past) \d+ (?:minute|hour|day|week|month|year)s?)': None,
+            r'(\d+ (?:day|week|month|year)s? ago)': None,
             r'(last week|past week)': 'last week',
             r'(yesterday|last day)': 'yesterday', 
             r'(today|this day)': 'today',
@@ -137,8 +524,10 @@ class NaturalLanguageSearchEngine:
         }
         
         for pattern, filter_val in time_patterns.items():
-            if re.search(pattern, query, re.IGNORECASE):
-                time_filter = filter_val
+            match = re.search(pattern, query, re.IGNORECASE)
+            if match:
+                # Open-ended spans keep the matched phrase for parse_time_range
+                time_filter = filter_val or match.group(1).lower()
                 query = re.sub(pattern, '', query, flags=re.IGNORECASE)
                 break
         
@@ -191,6 +580,7 @@ class NaturalLanguageSearchEngine:
             channel_hints=channel_hints
         )
     
+    @STAGE_SECONDS.time(stage='semantic_search')
     def semantic_search(self, query: str, messages: List[Dict], limit: int = 10) -> List[Dict]:
         """Perform semantic search on messages."""
         
@@ -198,137 +588,302 @@ class NaturalLanguageSearchEngine:
             return []
         
         if self.embedding_model:
+            if self.search_mode == 'hybrid':
+                return self._hybrid_search(query, messages, limit)
             return self._semantic_search_with_embeddings(query, messages, limit)
         else:
             return self._semantic_search_with_keywords(query, messages, limit)
     
+    def _embed_messages(self, query: Optional[str], messages: List[Dict],
+                        query_embedding: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return the normalized query embedding and one normalized row per message.
+        Vectors come from the in-memory cache, then the on-disk store; the query
+        (unless query_embedding is given or query is None) and all remaining misses
+        are encoded in a single batch.
+        """
+        # Copy cached vectors out before inserting anything that could evict them
+        keys = [embedding_key(message) for message in messages]
+        store_dim = self.embedding_store.dim if self.embedding_store is not None else None
+        matrix, missing = self.embeddings_cache.get_many(keys, dim=store_dim)
+        
+        # Fall back to the memory-mapped store and promote what it has into the cache
+        if missing and self.embedding_store is not None:
+            found, stored = self.embedding_store.get_many([keys[position] for position in missing])
+            if found:
+                found_positions = [missing[i] for i in found]
+                matrix[found_positions] = stored
+                self.embeddings_cache.put_many([keys[position] for position in found_positions], stored)
+                found_set = set(found_positions)
+                missing = [position for position in missing if position not in found_set]
+        
+        # Encode the query and every distinct uncached message in a single batch
+        missing_positions: Dict[Tuple, List[int]] = {}
+        for position in missing:
+            missing_positions.setdefault(keys[position], []).append(position)
+        missing_texts = [messages[positions[0]].get('text', '') for positions in missing_positions.values()]
+        
+        encode_query = query is not None and query_embedding is None
+        texts = ([query] if encode_query else []) + missing_texts
+        if not texts:
+            return query_embedding, matrix
+        with STAGE_SECONDS.time(stage='encode'):
+            encoded = self.embedding_model.encode(texts, normalize_embeddings=True)
+        ENCODED_TEXTS.inc(len(texts))
+        if encode_query:
+            query_embedding = encoded[0].astype(np.float32)
+            encoded = encoded[1:]
+        if matrix is None:
+            matrix = np.zeros((len(keys), encoded.shape[1]), dtype=np.float32)
+        for positions, embedding in zip(missing_positions.values(), encoded):
+            matrix[positions] = embedding
+        if missing_positions:
+            self.embeddings_cache.put_many(list(missing_positions), encoded)
+            if self.embedding_store is not None:
+                self.embedding_store.put_many(list(missing_positions), encoded)
+        
+        return query_embedding, matrix
+    
     def _semantic_search_with_embeddings(self, query: str, messages: List[Dict], limit: int) -> List[Dict]:
         """Use embeddings for semantic similarity search."""
         
         try:
-            # Generate query embedding
-            query_embedding = self.embedding_model.encode([query])
+            candidates = [message for message in messages if message.get('text', '')]
+            if not candidates:
+                return []
             
-            scored_messages = []
-            for message in messages:
-                text = message.get('text', '')
-                if not text:
-                    continue
-                
-                # Get or generate message embedding
-                msg_id = message.get('ts', str(hash(text)))
-                if msg_id not in self.embeddings_cache:
-                    self.embeddings_cache[msg_id] = self.embedding_model.encode([text])
-                
-                msg_embedding = self.embeddings_cache[msg_id]
+            if len(candidates) >= self.ann_min_candidates:
+                return self._semantic_search_with_index(query, candidates, limit)
+            
+            query_embedding, matrix = self._embed_messages(query, candidates)
+            
+            with STAGE_SECONDS.time(stage='similarity'):
+                # Score all messages with one matrix-vector product over unit vectors
+                similarities = matrix @ query_embedding
                 
-                # Calculate similarity
-                similarity = cosine_similarity(query_embedding, msg_embedding)[0][0]
+                scored_messages = []
+                for message, similarity in zip(candidates, similarities):
+                    if similarity > 0.2:  # Lower threshold for short terms and acronyms
+                        scored_messages.append({
+                            'message': message,
+                            'score': float(similarity),
+                            'match_reason': f'Semantic similarity: {similarity:.2f}'
+                        })
                 
-                if similarity > 0.2:  # Lower threshold for short terms and acronyms
-                    scored_messages.append({
-                        'message': message,
-                        'score': float(similarity),
-                        'match_reason': f'Semantic similarity: {similarity:.2f}'
-                    })
-            
-            # Sort by score and return top results
-            scored_messages.sort(key=lambda x: x['score'], reverse=True)
+                # Sort by score and return top results
+                scored_messages.sort(key=lambda x: x['score'], reverse=True)
             return scored_messages[:limit]
             
         except Exception as e:
             print(f"Embedding search failed: {e}")
             return self._semantic_search_with_keywords(query, messages, limit)
     
-    def _semantic_search_with_keywords(self, query: str, messages: List[Dict], limit: int) -> List[Dict]:
-        """Fallback keyword-based search."""
+    def _semantic_search_with_index(self, query: str, messages: List[Dict], limit: int) -> List[Dict]:
+        """Rank a large candidate set through the ANN index instead of scoring every message."""
+        
+        by_key = {embedding_key(message): message for message in messages}
+        
+        # Index any messages that arrived since the last search, embedding them in one batch
+        unindexed = [message for key, message in by_key.items() if key not in self.ann_index]
+        query_embedding, matrix = self._embed_messages(query, unindexed)
+        if unindexed:
+            self.ann_index.add([embedding_key(message) for message in unindexed], matrix)
+        self.ann_index.maybe_save()
+        
+        with STAGE_SECONDS.time(stage='similarity'):
+            neighbours = self.ann_index.search(query_embedding, limit, allowed=set(by_key))
         
-        query_words = set(query.lower().split())
         scored_messages = []
+        for key, similarity in neighbours:
+            if similarity > 0.2:  # Lower threshold for short terms and acronyms
+                scored_messages.append({
+                    'message': by_key[key],
+                    'score': similarity,
+                    'match_reason': f'Semantic similarity: {similarity:.2f}'
+                })
+        return scored_messages
+    
+    def _hybrid_search(self, query: str, messages: List[Dict], limit: int) -> List[Dict]:
+        """
+        Retrieve BM25 and vector candidates in parallel, fuse them with reciprocal
+        rank fusion and rerank only the fused pool with exact embedding scores.
+        """
         
-        for message in messages:
-            text = message.get('text', '').lower()
-            if not text:
-                continue
+        try:
+            candidates = [message for message in messages if message.get('text', '')]
+            if not candidates:
+                return []
+            pool_size = max(self.hybrid_candidates, limit)
             
-            # Calculate simple keyword score
-            text_words = set(text.split())
-            matches = query_words.intersection(text_words)
-            score = len(matches) / len(query_words) if query_words else 0
+            lexical_future = self._retrieval_pool.submit(self._lexical_ranking, query, candidates, pool_size)
+            query_embedding, vector = self._vector_ranking(query, candidates, pool_size)
+            lexical = lexical_future.result()
             
-            if score > 0:
+            fused = reciprocal_rank_fusion([[position for position, _ in lexical], vector], self.rrf_k)
+            pool = [position for position, _ in fused[:pool_size]]
+            
+            # Exact similarity for the pool only; lexical hits not embedded yet are encoded here
+            _, matrix = self._embed_messages(query, [candidates[position] for position in pool], query_embedding)
+            with STAGE_SECONDS.time(stage='similarity'):
+                similarities = dict(zip(pool, (matrix @ query_embedding).tolist()))
+            
+            matched_words = dict(lexical)
+            dense_order = sorted(pool, key=lambda position: similarities[position], reverse=True)
+            lexical_order = [position for position, _ in lexical if position in similarities]
+            
+            scored_messages = []
+            for position, score in reciprocal_rank_fusion([lexical_order, dense_order], self.rrf_k):
+                similarity = similarities[position]
+                words = matched_words.get(position)
+                # Vector-only candidates still need to be plausibly related
+                if not words and similarity <= 0.2:
+                    continue
+                reason = f'Semantic similarity: {similarity:.2f}'
+                if words:
+                    reason = f'Keywords: {", ".join(words)}; {reason.lower()}'
                 scored_messages.append({
-                    'message': message,
+                    'message': candidates[position],
                     'score': score,
-                    'match_reason': f'Keywords: {", ".join(matches)}'
+                    'match_reason': reason
                 })
+                if len(scored_messages) >= limit:
+                    break
+            return scored_messages
+        
+        except Exception as e:
+            print(f"Hybrid search failed: {e}", file=sys.stderr)
+            return self._semantic_search_with_keywords(query, messages, limit)
+    
+    @STAGE_SECONDS.time(stage='lexical')
+    def _lexical_ranking(self, query: str, candidates: List[Dict], n: int) -> List[Tuple[int, List[str]]]:
+        """Return (candidate position, matched words) for the top n BM25 matches."""
+        doc_ids = self.bm25_index.index(
+            [(message.get('channel_id', ''), message.get('ts', '')) for message in candidates],
+            [message['text'] for message in candidates],
+        )
+        return [(position, words) for position, _, words in self.bm25_index.search(query, n, doc_ids)]
+    
+    @STAGE_SECONDS.time(stage='vector')
+    def _vector_ranking(self, query: str, candidates: List[Dict], n: int) -> Tuple[np.ndarray, List[int]]:
+        """
+        Return the query embedding and the positions of the top n candidates by similarity.
+        Small candidate sets are scored exactly. Large ones are searched through the ANN
+        index, embedding at most hybrid_embed_budget unindexed messages per query.
+        """
+        if len(candidates) < self.ann_min_candidates:
+            query_embedding, matrix = self._embed_messages(query, candidates)
+            similarities = matrix @ query_embedding
+            n = min(n, len(candidates))
+            top = np.argpartition(-similarities, n - 1)[:n]
+            return query_embedding, top[np.argsort(-similarities[top])].tolist()
+        
+        keys = [embedding_key(message) for message in candidates]
+        unindexed = [position for position, key in enumerate(keys) if key not in self.ann_index]
+        unindexed = unindexed[:self.hybrid_embed_budget]
+        query_embedding, matrix = self._embed_messages(query, [candidates[position] for position in unindexed])
+        if unindexed:
+            self.ann_index.add([keys[position] for position in unindexed], matrix)
+        self.ann_index.maybe_save()
+        
+        position_of = {key: position for position, key in enumerate(keys)}
+        neighbours = self.ann_index.search(query_embedding, n, allowed=set(keys))
+        return query_embedding, [position_of[key] for key, _ in neighbours]
+    
+    @STAGE_SECONDS.time(stage='index_retrieval')
+    def index_candidates(self, query: str, channel_ids: List[str], n: int) -> List[Tuple[str, str]]:
+        """
+        Return (channel_id, ts) of the n indexed messages in channel_ids closest to
+        the query, so searches reach history older than the messages they fetched.
+        """
+        if not len(self.ann_index) or not self.embedding_model:
+            return []
+        try:
+            query_embedding, _ = self._embed_messages(query, [])
+            neighbours = self.ann_index.search(query_embedding, n, channels=channel_ids)
+        except Exception as e:
+            print(f"Index retrieval failed: {e}", file=sys.stderr)
+            return []
+        return [(key[0], key[1]) for key, similarity in neighbours if similarity > 0.2]
+    
+    def index_messages(self, messages: List[Dict], batch_size: int = 256) -> int:
+        """
+        Add messages to the keyword index and embed the ones missing from the ANN
+        index in batches, so later searches read precomputed data. Messages need
+        channel_id set, as search candidates have. Returns the number embedded.
+        """
+        candidates = [message for message in messages if message.get('text', '')]
+        if not candidates:
+            return 0
+        self.bm25_index.index(
+            [(message.get('channel_id', ''), message.get('ts', '')) for message in candidates],
+            [message['text'] for message in candidates],
+        )
+        if not self.embedding_model:
+            return 0
+        
+        unindexed = [message for message in candidates if embedding_key(message) not in self.ann_index]
+        for start in range(0, len(unindexed), batch_size):
+            batch = unindexed[start:start + batch_size]
+            _, matrix = self._embed_messages(None, batch)
+            self.ann_index.add([embedding_key(message) for message in batch], matrix)
+        self.ann_index.maybe_save()
+        return len(unindexed)
+    
+    def _semantic_search_with_keywords(self, query: str, messages: List[Dict], limit: int) -> List[Dict]:
+        """Fallback keyword search ranked by BM25."""
+        
+        candidates = [message for message in messages if message.get('text', '')]
+        doc_ids = self.bm25_index.index(
+            [(message.get('channel_id', ''), message.get('ts', '')) for message in candidates],
+            [message['text'] for message in candidates],
+        )
         
-        scored_messages.sort(key=lambda x: x['score'], reverse=True)
-        return scored_messages[:limit]
+        return [
+            {
+                'message': candidates[position],
+                'score': score,
+                'match_reason': f'Keywords: {", ".join(matches)}'
+            }
+            for position, score, matches in self.bm25_index.search(query, limit, doc_ids)
+        ]
     
+    @STAGE_SECONDS.time(stage='filter_time')
     def filter_by_time(self, messages: List[Dict], time_filter: str) -> List[Dict]:
-        """Filter messages by time range."""
+        """Filter messages by time range with one vectorized mask over their timestamps."""
         
-        if not time_filter:
+        time_range = parse_time_range(time_filter)
+        if not time_range:
             return messages
         
-        now = datetime.now()
-        cutoff = None
-        
-        if 'yesterday' in time_filter.lower():
-            cutoff = now - timedelta(days=1)
-        elif 'last week' in time_filter.lower() or 'past week' in time_filter.lower():
-            cutoff = now - timedelta(weeks=1)
-        elif 'today' in time_filter.lower():
-            cutoff = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        elif 'this week' in time_filter.lower():
-            days_since_monday = now.weekday()
-            cutoff = now - timedelta(days=days_since_monday)
-        elif 'last month' in time_filter.lower():
-            cutoff = now - timedelta(days=30)
-        
-        if cutoff:
-            filtered = []
-            for msg in messages:
-                try:
-                    msg_time = datetime.fromtimestamp(float(msg.get('ts', 0)))
-                    if msg_time >= cutoff:
-                        filtered.append(msg)
-                except:
-                    continue
-            return filtered
-        
-        return messages
+        batch = MessageBatch(messages)
+        return batch.select(batch.time_mask(*time_range))
     
+    @STAGE_SECONDS.time(stage='filter_user')
     def filter_by_user(self, messages: List[Dict], user_filter: str, slack_client) -> List[Dict]:
         """Filter messages by user."""
         
         if not user_filter:
             return messages
         
-        # Try to resolve username to user ID
-        user_id = None
+        # Resolve the name through the shared user directory's name index; messages that mention
+        # the name also match, which covers lookups made before the directory has loaded
+        user_ids = set()
         try:
-            # Search for user by name
-            users = slack_client.users_list()['members']
-            for user in users:
-                if (user.get('real_name', '').lower() == user_filter.lower() or 
-                    user.get('name', '').lower() == user_filter.lower()):
-                    user_id = user['id']
-                    break
-        except:
+            user_ids = user_directory.resolve_name(slack_client, user_filter)
+        except Exception:
             pass
         
         # Filter messages
         filtered = []
         for msg in messages:
             msg_user = msg.get('user', '')
-            if (msg_user == user_id or 
+            if (msg_user in user_ids or 
                 user_filter.lower() in msg.get('text', '').lower()):
                 filtered.append(msg)
         
         return filtered
     
+    @STAGE_SECONDS.time(stage='summary')
     def generate_summary(self, results: List[Dict], query: str) -> str:
         """Generate AI summary of search results."""
         
@@ -340,8 +895,19 @@ class NaturalLanguageSearchEngine:
         else:
             return self._generate_simple_summary(results, query)
     
+    def _summary_fingerprint(self, results: List[Dict], query: str) -> str:
+        """Fingerprint the normalized query and the ordered messages a summary is built from."""
+        keys = [list(embedding_key(result['message'])) for result in results[:5]]
+        payload = json.dumps([normalize_query(query), keys])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
     def _generate_llm_summary(self, results: List[Dict], query: str) -> str:
-        """Generate summary using LLM."""
+        """Generate summary using LLM, reusing the cached summary for an identical result set."""
+        
+        fingerprint = self._summary_fingerprint(results, query)
+        cached = self.summary_cache.get(fingerprint)
+        if cached is not None:
+            return cached
         
         try:
             # Extract key messages for summary
@@ -362,14 +928,17 @@ class NaturalLanguageSearchEngine:
             Focus on key insights, decisions, or important information.
             """
             
-            response = self.openai_client.chat.completions.create(
+            response = self._chat_completion(
+                'summary',
                 model="gpt-3.5-turbo",
                 messages=[{"role": "user", "content": prompt}],
                 max_tokens=100,
                 temperature=0.3
             )
             
-            return response.choices[0].message.content.strip()
+            summary = response.choices[0].message.content.strip()
+            self.summary_cache.put(fingerprint, summary)
+            return summary
             
         except Exception as e:
             print(f"LLM summary failed: {e}")
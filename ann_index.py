@@ -0,0 +1,405 @@
+"""
+Approximate nearest neighbour index for message embeddings.
+A pure NumPy inverted-file (IVF) index: vectors are clustered with spherical
+k-means and a query only scores the vectors in its nprobe closest clusters.
+Clustering runs in a background thread on a snapshot of the index, and the new
+centroids and lists are swapped in at once; meanwhile inserts join the
+existing clusters.
+Vectors are stored normalized and quantized (float16, or int8 with per-vector
+scales) and scored by dot product. The saved index is loaded on first use, and
+saves append only the rows added since the previous save.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from embedding_store import EmbeddingKey, quantize_rows, dequantize_rows, score_rows
+
+
+class IVFIndex:
+    """Inverted-file index over unit-normalized embeddings, scored by inner product."""
+
+    def __init__(self, path: Optional[str] = None, nprobe: int = 16, train_threshold: int = 4096,
+                 dtype: str = 'float16', save_interval: float = 60.0):
+        self.path = path
+        self.nprobe = nprobe
+        self.train_threshold = train_threshold
+        self.dtype = np.dtype(dtype)
+        self.save_interval = save_interval
+        self.centroids: Optional[np.ndarray] = None
+        self._keys: List[EmbeddingKey] = []
+        self._ids: Dict[EmbeddingKey, int] = {}
+        self._vectors: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._assign = np.zeros(0, dtype=np.int32)
+        # Small integer code of each row's channel, so searches can be limited to some channels
+        self._channel_codes: Dict[str, int] = {}
+        self._row_channels = np.zeros(0, dtype=np.int32)
+        self._lists: List[List[int]] = []
+        self._list_arrays: Dict[int, np.ndarray] = {}
+        self._trained_size = 0
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        # Rows already written to disk, and the length of the saved keys file
+        self._saved_count = 0
+        self._saved_keys_bytes = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._train_lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self.stats = {'searches': 0, 'scored': 0, 'trainings': 0}
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._keys)
+
+    def __contains__(self, key: EmbeddingKey) -> bool:
+        self._ensure_loaded()
+        return key in self._ids
+
+    @property
+    def _quantized(self) -> bool:
+        return self.dtype == np.int8
+
+    def _grow(self, extra: int, dim: int):
+        """Make room for extra vectors, doubling the backing arrays as needed."""
+        needed = len(self._keys) + extra
+        capacity = self._vectors.shape[0] if self._vectors is not None else 0
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2, 1024)
+        vectors = np.zeros((capacity, dim), dtype=self.dtype)
+        scales = np.ones(capacity, dtype=np.float32) if self._quantized else None
+        assign = np.full(capacity, -1, dtype=np.int32)
+        row_channels = np.zeros(capacity, dtype=np.int32)
+        if self._vectors is not None:
+            vectors[:len(self._keys)] = self._vectors[:len(self._keys)]
+            assign[:len(self._keys)] = self._assign[:len(self._keys)]
+            row_channels[:len(self._keys)] = self._row_channels[:len(self._keys)]
+            if scales is not None:
+                scales[:len(self._keys)] = self._scales[:len(self._keys)]
+        self._vectors, self._scales, self._assign = vectors, scales, assign
+        self._row_channels = row_channels
+
+    def _channel_code(self, channel_id: str) -> int:
+        return self._channel_codes.setdefault(channel_id, len(self._channel_codes))
+
+    @staticmethod
+    def _dequantized(vectors: np.ndarray, scales: Optional[np.ndarray], rows: np.ndarray) -> np.ndarray:
+        """Dequantized float32 copies of the given rows."""
+        return dequantize_rows(vectors[rows], scales[rows] if scales is not None else None)
+
+    def add(self, keys: List[EmbeddingKey], vectors: np.ndarray):
+        """Insert normalized vectors for keys not indexed yet."""
+        self._ensure_loaded()
+        with self._lock:
+            new = [position for position, key in enumerate(keys) if key not in self._ids]
+            if not new:
+                return
+            rows, scales = quantize_rows(np.asarray(vectors)[new], self.dtype)
+            self._grow(len(new), rows.shape[1])
+            start = len(self._keys)
+            for offset, position in enumerate(new):
+                self._ids[keys[position]] = start + offset
+                self._keys.append(keys[position])
+                self._row_channels[start + offset] = self._channel_code(keys[position][0])
+            self._vectors[start:start + len(new)] = rows
+            if scales is not None:
+                self._scales[start:start + len(new)] = scales
+
+            if self.centroids is not None:
+                self._assign_to_lists(np.arange(start, len(self._keys)))
+            self._dirty = True
+
+            # Retrain once the index has grown well past what the clustering was built for
+            if (len(self._keys) >= self.train_threshold and len(self._keys) >= 4 * self._trained_size
+                    and not self._train_lock.locked()):
+                threading.Thread(target=self.train, name='ann-train', daemon=True).start()
+
+    def _nearest_centroids(self, rows: np.ndarray, centroids: np.ndarray, vectors: np.ndarray,
+                           scales: Optional[np.ndarray], chunk: int = 8192) -> np.ndarray:
+        assign = np.empty(len(rows), dtype=np.int32)
+        for start in range(0, len(rows), chunk):
+            block = self._dequantized(vectors, scales, rows[start:start + chunk])
+            assign[start:start + chunk] = np.argmax(block @ centroids.T, axis=1)
+        return assign
+
+    def _assign_to_lists(self, rows: np.ndarray):
+        """Add rows to their nearest current clusters. Caller holds the lock."""
+        assign = self._nearest_centroids(rows, self.centroids, self._vectors, self._scales)
+        self._assign[rows] = assign
+        for row, list_id in zip(rows.tolist(), assign.tolist()):
+            self._lists[list_id].append(row)
+            self._list_arrays.pop(list_id, None)
+
+    def train(self, iterations: int = 10):
+        """
+        Cluster the indexed vectors with spherical k-means and rebuild the inverted lists.
+        Rows are append-only, so the clustering runs on a snapshot without the lock;
+        only rows added meanwhile are assigned under it before the swap.
+        """
+        self._ensure_loaded()
+        with self._train_lock:
+            with self._lock:
+                count = len(self._keys)
+                if count == 0 or count == self._trained_size:
+                    return
+                vectors, scales = self._vectors, self._scales
+            centroids, assign = self._cluster(vectors, scales, count, iterations)
+
+            with self._lock:
+                total = len(self._keys)
+                assign = np.concatenate([
+                    assign, self._nearest_centroids(np.arange(count, total), centroids, self._vectors, self._scales)
+                ])
+                lists = [[] for _ in range(len(centroids))]
+                for row, list_id in enumerate(assign.tolist()):
+                    lists[list_id].append(row)
+                self._assign[:total] = assign
+                self.centroids = centroids
+                self._lists = lists
+                self._list_arrays = {}
+                self._trained_size = count
+                self._dirty = True
+                self.stats['trainings'] += 1
+
+    def _cluster(self, vectors: np.ndarray, scales: Optional[np.ndarray], count: int,
+                 iterations: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return k-means centroids for the first count rows and each row's nearest centroid."""
+        nlist = int(min(4096, max(16, 4 * np.sqrt(count))))
+        rng = np.random.default_rng(0)
+        sample_rows = rng.choice(count, size=min(count, nlist * 64), replace=False)
+        sample = self._dequantized(vectors, scales, sample_rows)
+
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)]
+        for _ in range(iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = norms[:, 0] == 0
+            # Reseed empty clusters from random sample points
+            sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+            norms[empty] = 1.0
+            centroids = sums / norms
+
+        centroids = centroids.astype(np.float32)
+        return centroids, self._nearest_centroids(np.arange(count), centroids, vectors, scales)
+
+    def _list_array(self, list_id: int) -> np.ndarray:
+        array = self._list_arrays.get(list_id)
+        if array is None:
+            array = np.asarray(self._lists[list_id], dtype=np.int64)
+            self._list_arrays[list_id] = array
+        return array
+
+    def search(self, query: np.ndarray, k: int, allowed: Optional[Set[EmbeddingKey]] = None,
+               nprobe: Optional[int] = None, channels: Optional[Iterable[str]] = None) -> List[Tuple[EmbeddingKey, float]]:
+        """
+        Return up to k (key, score) pairs by descending inner product.
+        nprobe trades recall for latency; allowed restricts results to a key subset
+        and channels to the vectors of those channel IDs.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            count = len(self._keys)
+            if count == 0:
+                return []
+            query = query.astype(np.float32)
+
+            allowed_ids = None
+            if allowed is not None:
+                allowed_ids = np.fromiter((self._ids[key] for key in allowed if key in self._ids), dtype=np.int64)
+            if channels is not None:
+                codes = [self._channel_codes[channel] for channel in channels if channel in self._channel_codes]
+                in_channels = np.flatnonzero(np.isin(self._row_channels[:count], codes))
+                allowed_ids = in_channels if allowed_ids is None else np.intersect1d(allowed_ids, in_channels)
+
+            probes = min(nprobe or self.nprobe, len(self.centroids)) if self.centroids is not None else 0
+            if self.centroids is None:
+                candidates = np.arange(count) if allowed_ids is None else allowed_ids
+            elif allowed_ids is not None and len(allowed_ids) <= count * probes / len(self.centroids):
+                # A subset smaller than the probed lists is cheaper (and exact) to score directly
+                candidates = allowed_ids
+            else:
+                centroid_scores = self.centroids @ query
+                probe_lists = np.argpartition(-centroid_scores, probes - 1)[:probes]
+                candidates = np.concatenate([self._list_array(list_id) for list_id in probe_lists])
+                if allowed_ids is not None:
+                    mask = np.zeros(count, dtype=bool)
+                    mask[allowed_ids] = True
+                    candidates = candidates[mask[candidates]]
+            if len(candidates) == 0:
+                return []
+
+            scores = score_rows(
+                self._vectors[candidates], self._scales[candidates] if self._scales is not None else None, query
+            )
+            k = min(k, len(candidates))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            self.stats['searches'] += 1
+            self.stats['scored'] += len(candidates)
+            return [(self._keys[candidates[i]], float(scores[i])) for i in top]
+
+    def _data_paths(self) -> Tuple[str, str, str]:
+        base = os.path.splitext(self.path)[0]
+        return base + '.vectors', base + '.scales', base + '.keys'
+
+    @staticmethod
+    def _write_at(path: str, offset: int, data: bytes):
+        """Write data at offset, dropping anything after it (left by an interrupted save)."""
+        with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+            f.truncate(offset)
+            f.seek(offset)
+            f.write(data)
+
+    def save(self):
+        """
+        Persist the index to its path. Rows are append-only, so only the vectors,
+        scales and keys added since the last save are appended to their files; the
+        small metadata file (assignments, centroids, row count) is replaced last,
+        so an interrupted save leaves the previous state readable. The index lock
+        is only held to take a snapshot, so searches are not blocked by the I/O.
+        """
+        if not self.path:
+            return
+        self._ensure_loaded()
+        with self._save_lock:
+            with self._lock:
+                count = len(self._keys)
+                start = self._saved_count
+                vectors, scales = self._vectors, self._scales
+                keys = self._keys[start:count]
+                assign = self._assign[:count].copy()
+                centroids = self.centroids
+                trained_size = self._trained_size
+                self._dirty = False
+                self._saved_at = time.monotonic()
+
+            vectors_path, scales_path, keys_path = self._data_paths()
+            keys_bytes = self._saved_keys_bytes
+            if start and not all(os.path.exists(path) for path in (vectors_path, keys_path)):
+                # Data files went missing: write every row again
+                start, keys_bytes = 0, 0
+                keys = self._keys[:count]
+            try:
+                dim = vectors.shape[1] if vectors is not None else 0
+                if count > start:
+                    self._write_at(vectors_path, start * dim * self.dtype.itemsize, vectors[start:count].tobytes())
+                    if scales is not None:
+                        self._write_at(scales_path, start * 4, scales[start:count].astype(np.float32).tobytes())
+                    encoded = ''.join(json.dumps(list(key)) + '\n' for key in keys).encode('utf-8')
+                    self._write_at(keys_path, keys_bytes, encoded)
+                    keys_bytes += len(encoded)
+
+                tmp_path = self.path + '.tmp'
+                with open(tmp_path, 'wb') as f:
+                    np.savez(
+                        f,
+                        count=np.array(count),
+                        dim=np.array(dim),
+                        dtype=np.array(self.dtype.name),
+                        keys_bytes=np.array(keys_bytes),
+                        assign=assign,
+                        centroids=centroids if centroids is not None else np.zeros((0, 0), np.float32),
+                        trained_size=np.array(trained_size),
+                    )
+                os.replace(tmp_path, self.path)
+            except Exception:
+                self._dirty = True
+                raise
+            self._saved_count = count
+            self._saved_keys_bytes = keys_bytes
+
+    def maybe_save(self):
+        """Persist the index in a background thread if it changed and save_interval has passed."""
+        if (self.path and self._dirty and time.monotonic() - self._saved_at >= self.save_interval
+                and not self._save_lock.locked()):
+            self._saved_at = time.monotonic()
+            threading.Thread(target=self._save_in_background, name='ann-save', daemon=True).start()
+
+    def _save_in_background(self):
+        try:
+            self.save()
+        except Exception as e:
+            print(f"Warning: Could not save ANN index: {e}", file=sys.stderr)
+
+    def _ensure_loaded(self):
+        """Load the saved index on first use rather than at startup."""
+        if self._loaded:
+            return
+        with self._load_lock:
+            if self._loaded:
+                return
+            if self.path and os.path.exists(self.path):
+                try:
+                    self.load()
+                except Exception as e:
+                    print(f"Warning: Could not load ANN index: {e}", file=sys.stderr)
+            self._loaded = True
+
+    def load(self):
+        """Load a previously saved index from its path."""
+        with np.load(self.path, allow_pickle=False) as data:
+            count = int(data['count'])
+            dim = int(data['dim'])
+            saved_dtype = np.dtype(str(data['dtype']))
+            keys_bytes = int(data['keys_bytes'])
+            assign = data['assign']
+            centroids = data['centroids']
+            trained_size = int(data['trained_size'])
+
+        vectors_path, scales_path, keys_path = self._data_paths()
+        keys, vectors, scales = [], None, None
+        if count:
+            with open(keys_path, 'rb') as f:
+                keys = [tuple(json.loads(line)) for line in f.read(keys_bytes).decode('utf-8').splitlines()]
+            vectors = np.fromfile(vectors_path, dtype=saved_dtype, count=count * dim).reshape(count, dim)
+            if saved_dtype == np.int8:
+                scales = np.fromfile(scales_path, dtype=np.float32, count=count)
+            if len(keys) != count or len(vectors) != count or (scales is not None and len(scales) != count):
+                raise ValueError("index files are shorter than its metadata")
+
+        with self._lock:
+            self._keys = keys
+            self._ids = {key: row for row, key in enumerate(keys)}
+            self._vectors, self._scales = None, None
+            self._saved_count, self._saved_keys_bytes = count, keys_bytes
+            if count:
+                if saved_dtype == self.dtype:
+                    self._vectors, self._scales = vectors, scales
+                else:
+                    # Saved with another storage dtype: convert once on load and rewrite on the next save
+                    self._vectors, self._scales = quantize_rows(dequantize_rows(vectors, scales), self.dtype)
+                    self._saved_count, self._saved_keys_bytes = 0, 0
+                    self._dirty = True
+            self._assign = assign.astype(np.int32)
+            self._channel_codes = {}
+            self._row_channels = np.array([self._channel_code(key[0]) for key in keys], dtype=np.int32)
+            self._trained_size = trained_size
+            self._list_arrays = {}
+            if centroids.size:
+                self.centroids = centroids
+                self._lists = [[] for _ in range(len(centroids))]
+                for row, list_id in enumerate(self._assign.tolist()):
+                    self._lists[list_id].append(row)
+            else:
+                self.centroids = None
+                self._lists = []
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return index size, cluster count and search counters."""
+        with self._lock:
+            nlist = len(self.centroids) if self.centroids is not None else 0
+            nbytes = self._vectors[:len(self._keys)].nbytes if self._vectors is not None else 0
+            nbytes += self._scales[:len(self._keys)].nbytes if self._scales is not None else 0
+            return dict(self.stats, size=len(self._keys), nlist=nlist, nprobe=self.nprobe, bytes=nbytes,
+                        dtype=self.dtype.name, loaded=self._loaded)
@@ -0,0 +1,493 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for the MCP tools.
+Starts a local fake Slack Web API backed by a synthetic workspace, points the
+server's Slack clients at it and drives each tool through an in-memory MCP
+client under concurrent load, reporting latency percentiles, throughput and
+Slack API calls per request.
+
+    uv run python benchmark.py --channels 50 --messages 1000 --latency-ms 30 --rate-limit-ratio 0.02
+
+With --embeddings it instead compares embedding storage formats (float32,
+float16, int8 with per-vector scales) on synthetic vectors: memory, exact and
+ANN scoring latency, and recall against float32 exact search.
+
+    uv run python benchmark.py --embeddings --vectors 100000 --dim 384
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlparse
+
+import numpy as np
+
+VOCAB = [
+    'deploy', 'release', 'rollback', 'incident', 'outage', 'latency', 'database', 'migration',
+    'api', 'frontend', 'backend', 'mobile', 'review', 'merge', 'build', 'pipeline', 'test',
+    'bug', 'fix', 'customer', 'ticket', 'alert', 'dashboard', 'metrics', 'cache', 'timeout',
+    'error', 'config', 'kubernetes', 'cluster', 'budget', 'roadmap', 'planning', 'design',
+    'meeting', 'decision', 'launch', 'feedback', 'performance', 'security', 'auth', 'login',
+    'payment', 'search', 'index', 'queue', 'worker', 'retry', 'staging', 'production',
+]
+
+FIRST_NAMES = ['alex', 'sam', 'jordan', 'taylor', 'morgan', 'casey', 'riley', 'jamie', 'drew', 'quinn']
+
+
+class SyntheticWorkspace:
+    """Deterministic fake workspace: users, channels, message history and threads."""
+
+    def __init__(self, channels: int = 20, users: int = 200, messages: int = 500,
+                 thread_ratio: float = 0.1, replies: int = 5, seed: int = 0):
+        rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.users = [
+            {
+                'id': f'U{i:08d}',
+                'name': f'{FIRST_NAMES[i % len(FIRST_NAMES)]}{i}',
+                'deleted': False,
+                'is_bot': False,
+                'real_name': f'{FIRST_NAMES[i % len(FIRST_NAMES)].title()} {rng.choice(VOCAB).title()}',
+                'profile': {'display_name': f'{FIRST_NAMES[i % len(FIRST_NAMES)]}{i}', 'email': f'user{i}@example.com'},
+            }
+            for i in range(users)
+        ]
+        self.users_by_id = {user['id']: user for user in self.users}
+        self.channels = [
+            {
+                'id': f'C{i:08d}',
+                'name': f'{rng.choice(VOCAB)}-{i}',
+                'is_private': i % 5 == 0,
+                'is_member': True,
+                'is_archived': False,
+                'num_members': rng.randint(2, users),
+            }
+            for i in range(channels)
+        ]
+        self.channels_by_id = {channel['id']: channel for channel in self.channels}
+
+        # History is stored oldest first; timestamps span the last 30 days
+        now = time.time()
+        self.history: Dict[str, List[Dict[str, Any]]] = {}
+        self.replies: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for channel in self.channels:
+            step = 30 * 86400 / max(messages, 1)
+            history = []
+            for n in range(messages):
+                ts = f'{now - 30 * 86400 + n * step:.6f}'
+                msg = {'type': 'message', 'ts': ts, 'user': rng.choice(self.users)['id'], 'text': self._text(rng)}
+                if rng.random() < thread_ratio:
+                    thread = [
+                        {'type': 'message', 'ts': f'{float(ts) + (r + 1) * step / (replies + 1):.6f}', 'thread_ts': ts,
+                         'user': rng.choice(self.users)['id'], 'text': self._text(rng)}
+                        for r in range(replies)
+                    ]
+                    msg.update(thread_ts=ts, reply_count=len(thread), latest_reply=thread[-1]['ts'])
+                    self.replies[(channel['id'], ts)] = thread
+                history.append(msg)
+            self.history[channel['id']] = history
+
+    def _text(self, rng: random.Random) -> str:
+        words = rng.sample(VOCAB, rng.randint(4, 12))
+        if rng.random() < 0.2:
+            words.insert(rng.randrange(len(words)), f'<@{rng.choice(self.users)["id"]}>')
+        return ' '.join(words)
+
+    def post_message(self, channel_id: str, text: str) -> Dict[str, Any]:
+        with self._lock:
+            history = self.history[channel_id]
+            ts = f'{max(time.time(), float(history[-1]["ts"]) + 0.000001 if history else 0):.6f}'
+            msg = {'type': 'message', 'ts': ts, 'user': self.users[0]['id'], 'text': text}
+            history.append(msg)
+            return msg
+
+
+def _page(items: List[Any], params: Dict[str, str], default_limit: int = 100) -> Tuple[List[Any], str]:
+    """Slice items by limit and an offset cursor, returning the page and next cursor."""
+    limit = int(params.get('limit') or default_limit) or default_limit
+    offset = int(params.get('cursor') or 0)
+    end = offset + limit
+    return items[offset:end], (str(end) if end < len(items) else '')
+
+
+class FakeSlackAPI:
+    """Local HTTP server implementing the Slack Web API methods the tools use."""
+
+    def __init__(self, workspace: SyntheticWorkspace, latency: float = 0.0, jitter: float = 0.0,
+                 rate_limit_ratio: float = 0.0, retry_after: int = 1, seed: int = 0):
+        self.workspace = workspace
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_ratio = rate_limit_ratio
+        self.retry_after = retry_after
+        self.calls: Counter = Counter()
+        self.rate_limited: Counter = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self.handlers = {
+            'conversations.list': self.conversations_list,
+            'conversations.history': self.conversations_history,
+            'conversations.info': self.conversations_info,
+            'conversations.replies': self.conversations_replies,
+            'users.info': self.users_info,
+            'users.list': self.users_list,
+            'chat.postMessage': self.chat_post_message,
+        }
+
+    def conversations_list(self, params):
+        channels = self.workspace.channels
+        if params.get('exclude_archived') in ('1', 'true', 'True'):
+            channels = [channel for channel in channels if not channel['is_archived']]
+        page, cursor = _page(channels, params)
+        return {'ok': True, 'channels': page, 'response_metadata': {'next_cursor': cursor}}
+
+    def conversations_history(self, params):
+        history = self.workspace.history.get(params.get('channel'))
+        if history is None:
+            return {'ok': False, 'error': 'channel_not_found'}
+        oldest = float(params.get('oldest') or 0)
+        newest_first = [msg for msg in reversed(history) if float(msg['ts']) >= oldest]
+        page, cursor = _page(newest_first, params)
+        return {'ok': True, 'messages': page, 'has_more': bool(cursor), 'response_metadata': {'next_cursor': cursor}}
+
+    def conversations_info(self, params):
+        channel = self.workspace.channels_by_id.get(params.get('channel'))
+        if channel is None:
+            return {'ok': False, 'error': 'channel_not_found'}
+        return {'ok': True, 'channel': channel}
+
+    def conversations_replies(self, params):
+        channel_id, thread_ts = params.get('channel'), params.get('ts')
+        parent = next((msg for msg in self.workspace.history.get(channel_id, []) if msg['ts'] == thread_ts), None)
+        if parent is None:
+            return {'ok': False, 'error': 'thread_not_found'}
+        oldest = float(params.get('oldest') or 0)
+        thread = [parent] + [msg for msg in self.workspace.replies.get((channel_id, thread_ts), []) if float(msg['ts']) >= oldest]
+        page, cursor = _page(thread, params)
+        return {'ok': True, 'messages': page, 'has_more': bool(cursor), 'response_metadata': {'next_cursor': cursor}}
+
+    def users_info(self, params):
+        user = self.workspace.users_by_id.get(params.get('user'))
+        if user is None:
+            return {'ok': False, 'error': 'user_not_found'}
+        return {'ok': True, 'user': user}
+
+    def users_list(self, params):
+        page, cursor = _page(self.workspace.users, params)
+        return {'ok': True, 'members': page, 'response_metadata': {'next_cursor': cursor}}
+
+    def chat_post_message(self, params):
+        if params.get('channel') not in self.workspace.channels_by_id:
+            return {'ok': False, 'error': 'channel_not_found'}
+        msg = self.workspace.post_message(params['channel'], params.get('text', ''))
+        return {'ok': True, 'channel': params['channel'], 'ts': msg['ts'], 'message': msg}
+
+    def handle(self, method: str, params: Dict[str, str]) -> Tuple[int, Dict[str, Any]]:
+        """Return (status, body) for one API call, applying latency and 429 injection."""
+        with self._lock:
+            self.calls[method] += 1
+            limited = self._rng.random() < self.rate_limit_ratio
+            delay = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+        time.sleep(delay)
+        if limited:
+            with self._lock:
+                self.rate_limited[method] += 1
+            return 429, {'ok': False, 'error': 'ratelimited'}
+        handler = self.handlers.get(method)
+        if handler is None:
+            return 200, {'ok': False, 'error': 'unknown_method'}
+        return 200, handler(params)
+
+    def start(self) -> str:
+        """Serve in a background thread and return the base URL for the Slack clients."""
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _serve(self):
+                url = urlparse(self.path)
+                params = dict(parse_qsl(url.query))
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                if body:
+                    if 'json' in (self.headers.get('Content-Type') or ''):
+                        params.update({k: str(v) for k, v in json.loads(body).items()})
+                    else:
+                        params.update(parse_qsl(body.decode('utf-8')))
+                status, payload = api.handle(url.path.rsplit('/', 1)[-1], params)
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                if status == 429:
+                    self.send_header('Retry-After', str(api.retry_after))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = _serve
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f'http://127.0.0.1:{self._server.server_address[1]}/api/'
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def snapshot(self) -> Tuple[int, int]:
+        """Return total (calls, 429 responses) served so far."""
+        with self._lock:
+            return sum(self.calls.values()), sum(self.rate_limited.values())
+
+
+def tool_scenarios(workspace: SyntheticWorkspace, rng: random.Random) -> Dict[str, Any]:
+    """Argument generators for each tool, in the order they are benchmarked."""
+    channel_ids = [channel['id'] for channel in workspace.channels]
+    user_ids = [user['id'] for user in workspace.users]
+    return {
+        'slack_list_channels': lambda: {},
+        'slack_get_channel_messages': lambda: {'channel_id': rng.choice(channel_ids), 'limit': 20},
+        'slack_search_messages': lambda: {'query': rng.choice(VOCAB), 'limit': 10},
+        'slack_get_user_info': lambda: {'user_id': rng.choice(user_ids)},
+        'slack_smart_search': lambda: {
+            'query': f'{rng.choice(VOCAB)} {rng.choice(VOCAB)} issues from last week', 'include_summary': False,
+        },
+        'slack_send_message': lambda: {'channel_id': rng.choice(channel_ids), 'text': 'benchmark message'},
+    }
+
+
+def _result_text(result) -> str:
+    content = getattr(result, 'content', result)
+    return content[0].text if content else ''
+
+
+async def run_tool(client, api: FakeSlackAPI, name: str, make_args, requests: int,
+                   concurrency: int, warmup: int) -> Dict[str, Any]:
+    """Call one tool requests times with bounded concurrency and summarize the run."""
+    for _ in range(warmup):
+        await client.call_tool(name, make_args())
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def call():
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                text = _result_text(await client.call_tool(name, make_args()))
+                if text.startswith(('Error', 'Slack API error')):
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    calls_before, limited_before = api.snapshot()
+    started = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    calls_after, limited_after = api.snapshot()
+
+    p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+    return {
+        'tool': name,
+        'requests': requests,
+        'errors': errors,
+        'p50_ms': round(float(p50), 2),
+        'p95_ms': round(float(p95), 2),
+        'p99_ms': round(float(p99), 2),
+        'throughput_rps': round(requests / elapsed, 2),
+        'api_calls_per_request': round((calls_after - calls_before) / requests, 3),
+        'rate_limited': limited_after - limited_before,
+    }
+
+
+def print_report(results: List[Dict[str, Any]]):
+    header = f"{'tool':<28}{'reqs':>6}{'errs':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}{'api/req':>9}{'429s':>6}"
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        print(f"{r['tool']:<28}{r['requests']:>6}{r['errors']:>6}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}"
+              f"{r['p99_ms']:>10.1f}{r['throughput_rps']:>9.1f}{r['api_calls_per_request']:>9.2f}{r['rate_limited']:>6}")
+
+
+async def run_benchmark(args) -> List[Dict[str, Any]]:
+    workspace = SyntheticWorkspace(args.channels, args.users, args.messages, args.thread_ratio, args.replies, args.seed)
+    api = FakeSlackAPI(workspace, args.latency_ms / 1000, args.jitter_ms / 1000, args.rate_limit_ratio,
+                       args.retry_after, args.seed)
+    base_url = api.start()
+
+    # Point the server at the fake API and keep its state out of the user's real stores
+    workdir = tempfile.mkdtemp(prefix='slack-mcp-bench-')
+    os.environ.update(
+        SLACK_BOT_TOKEN='xoxb-benchmark',
+        SLACK_API_BASE_URL=base_url,
+        SLACK_MESSAGE_STORE=os.path.join(workdir, 'messages.db'),
+        EMBEDDING_STORE_DIR='',
+        AI_WARMUP='0',
+    )
+    os.environ.pop('QUERY_CACHE_PATH', None)
+    if not args.with_llm:
+        os.environ.pop('OPENAI_API_KEY', None)
+
+    import slack_scheduler
+    # Scale Slack's per-tier limits so the run measures the tools rather than the limiter
+    for tier in slack_scheduler.TIER_RATES:
+        slack_scheduler.TIER_RATES[tier] *= args.rate_scale
+
+    import main as server
+    from fastmcp import Client
+
+    rng = random.Random(args.seed)
+    scenarios = tool_scenarios(workspace, rng)
+    tools = args.tools.split(',') if args.tools else list(scenarios)
+    results = []
+    try:
+        async with Client(server.mcp) as client:
+            for name in tools:
+                if name not in scenarios:
+                    print(f"Skipping unknown tool: {name}", file=sys.stderr)
+                    continue
+                results.append(await run_tool(client, api, name, scenarios[name], args.requests,
+                                              args.concurrency, args.warmup))
+    finally:
+        api.stop()
+    return results
+
+
+def synthetic_embeddings(count: int, dim: int, clusters: int = 256, seed: int = 0) -> np.ndarray:
+    """Clustered random vectors, roughly the shape of sentence embeddings of related messages."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, size=count)] + 0.6 * rng.normal(size=(count, dim)).astype(np.float32)
+    return vectors
+
+
+def _timed_ms(fn, repeat: int) -> Tuple[float, Any]:
+    result = fn()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - started) / repeat * 1000, result
+
+
+def run_embedding_benchmark(args) -> List[Dict[str, Any]]:
+    """Compare storage dtypes for memory, scoring latency and recall@k against float32 exact search."""
+    from embedding_store import normalize_rows, quantize_rows, score_rows
+    from ann_index import IVFIndex
+
+    vectors = synthetic_embeddings(args.vectors, args.dim, seed=args.seed)
+    queries = normalize_rows(synthetic_embeddings(args.queries, args.dim, seed=args.seed + 1))
+    unit = normalize_rows(vectors)
+    k = args.k
+
+    def top_k(scores: np.ndarray) -> np.ndarray:
+        return np.argpartition(-scores, k - 1)[:k]
+
+    truth = [set(top_k(unit @ query).tolist()) for query in queries]
+    results = []
+
+    # Baseline: raw float32 vectors normalized inside every similarity call, as cosine_similarity did
+    def cosine_scan():
+        return [top_k((vectors @ query) / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query))) for query in queries]
+    scan_ms, _ = _timed_ms(cosine_scan, args.repeat)
+    results.append({'format': 'float32 (normalize per query)', 'bytes_per_vector': args.dim * 4,
+                    'memory_mb': round(vectors.nbytes / 2 ** 20, 1), 'exact_ms': round(scan_ms / len(queries), 3),
+                    'exact_recall': 1.0, 'ann_ms': None, 'ann_recall': None})
+
+    keys = [('bench', str(i), '') for i in range(len(vectors))]
+    for dtype in ('float32', 'float16', 'int8'):
+        rows, scales = quantize_rows(vectors, np.dtype(dtype))
+        nbytes = rows.nbytes + (scales.nbytes if scales is not None else 0)
+
+        if dtype == 'float32':
+            def exact():
+                return [top_k(rows @ query) for query in queries]
+        else:
+            def exact():
+                return [top_k(score_rows(rows, scales, query)) for query in queries]
+        exact_ms, found = _timed_ms(exact, args.repeat)
+        exact_recall = np.mean([len(truth[i] & set(found[i].tolist())) / k for i in range(len(queries))])
+
+        index = IVFIndex(dtype=dtype, nprobe=args.nprobe)
+        index.add(keys, unit)
+        # Clustering runs in the background after add(); wait for it so ANN rows measure the trained index
+        index.train()
+        ann_ms, found = _timed_ms(lambda: [index.search(query, k) for query in queries], args.repeat)
+        ann_recall = np.mean([
+            len(truth[i] & {int(key[1]) for key, _ in found[i]}) / k for i in range(len(queries))
+        ])
+        results.append({'format': dtype, 'bytes_per_vector': nbytes // len(vectors),
+                        'memory_mb': round(nbytes / 2 ** 20, 1), 'exact_ms': round(exact_ms / len(queries), 3),
+                        'exact_recall': round(float(exact_recall), 4), 'ann_ms': round(ann_ms / len(queries), 3),
+                        'ann_recall': round(float(ann_recall), 4)})
+    return results
+
+
+def print_embedding_report(results: List[Dict[str, Any]], args):
+    print(f"{args.vectors} vectors x {args.dim} dims, {args.queries} queries, recall@{args.k} vs float32 exact, nprobe {args.nprobe}")
+    header = f"{'format':<32}{'B/vec':>7}{'MB':>8}{'exact ms':>10}{'recall':>8}{'ANN ms':>9}{'recall':>8}"
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        ann_ms = f"{r['ann_ms']:>9.3f}" if r['ann_ms'] is not None else f"{'-':>9}"
+        ann_recall = f"{r['ann_recall']:>8.3f}" if r['ann_recall'] is not None else f"{'-':>8}"
+        print(f"{r['format']:<32}{r['bytes_per_vector']:>7}{r['memory_mb']:>8.1f}{r['exact_ms']:>10.3f}"
+              f"{r['exact_recall']:>8.3f}{ann_ms}{ann_recall}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the MCP tools against a local fake Slack API")
+    parser.add_argument('--channels', type=int, default=20)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--messages', type=int, default=500, help="messages per channel")
+    parser.add_argument('--thread-ratio', type=float, default=0.1, help="fraction of messages that start a thread")
+    parser.add_argument('--replies', type=int, default=5, help="replies per thread")
+    parser.add_argument('--latency-ms', type=float, default=20.0, help="fake API latency per call")
+    parser.add_argument('--jitter-ms', type=float, default=5.0)
+    parser.add_argument('--rate-limit-ratio', type=float, default=0.0, help="fraction of calls answered with 429")
+    parser.add_argument('--retry-after', type=int, default=1, help="Retry-After seconds on injected 429s")
+    parser.add_argument('--rate-scale', type=float, default=100.0, help="multiplier on Slack's tier rate limits")
+    parser.add_argument('--requests', type=int, default=50, help="timed requests per tool")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--warmup', type=int, default=2, help="untimed requests per tool before measuring")
+    parser.add_argument('--tools', default='', help="comma-separated tools to run (default: all)")
+    parser.add_argument('--with-llm', action='store_true', help="keep OPENAI_API_KEY so smart search calls the LLM")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="also write the results to this file")
+    parser.add_argument('--embeddings', action='store_true', help="benchmark embedding storage formats instead of the tools")
+    parser.add_argument('--vectors', type=int, default=100000, help="synthetic vectors for --embeddings")
+    parser.add_argument('--dim', type=int, default=384, help="embedding dimension for --embeddings")
+    parser.add_argument('--queries', type=int, default=50, help="queries for --embeddings")
+    parser.add_argument('--k', type=int, default=10, help="recall@k for --embeddings")
+    parser.add_argument('--nprobe', type=int, default=16, help="ANN clusters probed for --embeddings")
+    parser.add_argument('--repeat', type=int, default=3, help="timed repetitions for --embeddings")
+    args = parser.parse_args()
+
+    if args.embeddings:
+        results = run_embedding_benchmark(args)
+        print_embedding_report(results, args)
+    else:
+        results = asyncio.run(run_benchmark(args))
+        print_report(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
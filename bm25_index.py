@@ -0,0 +1,261 @@
+"""
+Incremental BM25 index for keyword search over Slack messages.
+Messages are tokenized once when added, with Slack markup (user and channel
+mentions, links, emoji) mapped to stable tokens and words reduced by a light
+suffix stemmer. Posting lists and document lengths are kept up to date so a
+query only touches the postings of its own terms. Documents replaced by an
+edit are tombstoned: they leave the corpus statistics at once and their
+postings are dropped when enough of them pile up.
+"""
+
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, Any, Hashable, List, Tuple
+from urllib.parse import urlparse
+
+import numpy as np
+
+_MARKUP = re.compile(r'<([^<>]+)>')
+_EMOJI = re.compile(r':([a-z0-9_+\-\']+):')
+_WORD = re.compile(r'[^\W_]+')
+
+
+def stem(word: str) -> str:
+    """Reduce a lowercase word with a conservative suffix stemmer so inflections share a token."""
+    if len(word) <= 3 or not word.isalpha():
+        return word
+    # Plurals: issues -> issue, replies -> reply, deploys -> deploy
+    if word.endswith('ies') and len(word) > 4:
+        word = word[:-3] + 'y'
+    elif word.endswith('es') and not word.endswith(('aes', 'ees', 'oes')):
+        word = word[:-1]
+    elif word.endswith('s') and not word.endswith(('us', 'ss')):
+        word = word[:-1]
+    # Verb forms: deploying, deployed -> deploy; used, using -> use
+    for suffix in ('ing', 'ed'):
+        if not word.endswith(suffix) or word.endswith('eed'):
+            continue
+        base = word[:-len(suffix)]
+        if not any(char in 'aeiouy' for char in base):
+            # thing, bring: no vowel left, so not an inflection
+            break
+        if len(base) >= 3:
+            word = base
+        elif len(base) == 2:
+            # Short stems lost a silent e (us-ed -> use) unless they end in a vowel (do-ing -> do)
+            word = base if base[-1] in 'aeiouy' else base + 'e'
+        break
+    # stopped -> stopp -> stop
+    if len(word) > 3 and word[-1] == word[-2] and word[-1] not in 'aeiouslz':
+        word = word[:-1]
+    # release, released, releasing -> releas
+    if len(word) > 3 and word.endswith('e'):
+        word = word[:-1]
+    return word
+
+
+def _markup_tokens(inner: str) -> List[Tuple[str, str]]:
+    target, _, label = inner.partition('|')
+    if target.startswith('@'):
+        # User mention <@U123> or <@U123|alex>
+        return [('@' + target[1:].lower(), '<' + inner + '>')]
+    if target.startswith('#'):
+        # Channel mention <#C123|general>: match by ID and by name
+        tokens = [('#' + target[1:].lower(), '#' + (label or target[1:]))]
+        if label:
+            tokens.append(('#' + label.lower(), '#' + label))
+        return tokens
+    if target.startswith('!'):
+        # Special mentions <!here>, <!channel>, <!subteam^S123>
+        return [('!' + target[1:].split('^')[0].lower(), '@' + target[1:])]
+    # Links <https://host/path|label>: index the host and the label's words
+    parsed = urlparse(target)
+    host = parsed.netloc or parsed.path.partition('@')[2] or target
+    tokens = [(host.lower(), host)]
+    tokens.extend(_word_tokens(label))
+    return tokens
+
+
+def _word_tokens(text: str) -> List[Tuple[str, str]]:
+    return [(stem(word.lower()), word) for word in _WORD.findall(text)]
+
+
+def tokenize_with_surface(text: str) -> List[Tuple[str, str]]:
+    """Tokenize Slack message text into (token, surface form) pairs."""
+    tokens: List[Tuple[str, str]] = []
+
+    def replace_markup(match) -> str:
+        tokens.extend(_markup_tokens(match.group(1)))
+        return ' '
+
+    text = _MARKUP.sub(replace_markup, text or '')
+    # Emoji :rocket: or :white_check_mark: index as their name's words
+    text = _EMOJI.sub(lambda match: ' ' + match.group(1).replace('_', ' ').replace('-', ' ') + ' ', text)
+    tokens.extend(_word_tokens(text))
+    return tokens
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokenize Slack message text into BM25 terms."""
+    return [token for token, _ in tokenize_with_surface(text)]
+
+
+class BM25Index:
+    """
+    Okapi BM25 over an append-only document set.
+    Documents are addressed by a caller key (e.g. channel and ts); when a key's
+    text changes it is indexed again as a new document and the key moves to it.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, compact_ratio: float = 0.25):
+        self.k1 = k1
+        self.b = b
+        self.compact_ratio = compact_ratio
+        self._docs: Dict[Hashable, Tuple[int, int]] = {}
+        # Document ids are never reused; replaced documents are tombstoned
+        self._doc_count = 0
+        self._live_count = 0
+        self._doc_len = np.zeros(1024, dtype=np.float32)
+        self._doc_terms: List[Tuple[str, ...]] = []
+        self._total_len = 0
+        # Live documents per term, for IDF
+        self._df: Dict[str, int] = {}
+        self._dead_postings = 0
+        self._total_postings = 0
+        # Posting lists grow by appending; numpy copies are built lazily and dropped on change
+        self._postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        self._posting_arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._lock = threading.Lock()
+        self.stats = {'searches': 0, 'postings_scored': 0, 'tombstoned': 0, 'compactions': 0}
+
+    def __len__(self) -> int:
+        return self._live_count
+
+    def _add_document(self, text: str) -> int:
+        """Append one document and return its id. Caller holds the lock."""
+        doc_id = self._doc_count
+        self._doc_count += 1
+        self._live_count += 1
+        if doc_id >= len(self._doc_len):
+            self._doc_len = np.concatenate([self._doc_len, np.zeros_like(self._doc_len)])
+        terms = Counter(tokenize(text))
+        length = sum(terms.values())
+        self._doc_len[doc_id] = length
+        self._doc_terms.append(tuple(terms))
+        self._total_len += length
+        self._total_postings += len(terms)
+        for term, tf in terms.items():
+            docs, tfs = self._postings.setdefault(term, ([], []))
+            docs.append(doc_id)
+            tfs.append(tf)
+            self._df[term] = self._df.get(term, 0) + 1
+            self._posting_arrays.pop(term, None)
+        return doc_id
+
+    def _tombstone(self, doc_id: int):
+        """Remove a replaced document from the corpus statistics. Caller holds the lock."""
+        self._live_count -= 1
+        self._total_len -= int(self._doc_len[doc_id])
+        terms = self._doc_terms[doc_id]
+        for term in terms:
+            self._df[term] -= 1
+        self._doc_terms[doc_id] = ()
+        self._dead_postings += len(terms)
+        self.stats['tombstoned'] += 1
+        if self._dead_postings > self.compact_ratio * self._total_postings:
+            self._compact()
+
+    def _compact(self):
+        """Drop the postings of tombstoned documents. Caller holds the lock."""
+        for term in [term for term, df in self._df.items() if df == 0]:
+            del self._df[term]
+            del self._postings[term]
+        for term, (docs, tfs) in self._postings.items():
+            live = [(doc, tf) for doc, tf in zip(docs, tfs) if self._doc_terms[doc]]
+            if len(live) != len(docs):
+                self._postings[term] = ([doc for doc, _ in live], [tf for _, tf in live])
+        self._posting_arrays = {}
+        self._total_postings -= self._dead_postings
+        self._dead_postings = 0
+        self.stats['compactions'] += 1
+
+    def index(self, keys: List[Hashable], texts: List[str]) -> np.ndarray:
+        """Index texts whose key is new or whose text changed; return the document id for every key."""
+        doc_ids = np.empty(len(keys), dtype=np.int64)
+        with self._lock:
+            for position, (key, text) in enumerate(zip(keys, texts)):
+                entry = self._docs.get(key)
+                text_hash = hash(text)
+                if entry is None or entry[1] != text_hash:
+                    if entry is not None:
+                        self._tombstone(entry[0])
+                    entry = (self._add_document(text), text_hash)
+                    self._docs[key] = entry
+                doc_ids[position] = entry[0]
+        return doc_ids
+
+    def _posting_array(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        arrays = self._posting_arrays.get(term)
+        if arrays is None:
+            docs, tfs = self._postings.get(term, ([], []))
+            arrays = (np.asarray(docs, dtype=np.int64), np.asarray(tfs, dtype=np.float32))
+            self._posting_arrays[term] = arrays
+        return arrays
+
+    def search(self, query: str, k: int, doc_ids: np.ndarray) -> List[Tuple[int, float, List[str]]]:
+        """
+        Rank the documents in doc_ids (as returned by index()) against query.
+        Returns up to k (position in doc_ids, score, matched query words) by descending
+        BM25 score; corpus statistics cover every indexed document.
+        """
+        query_terms: Dict[str, str] = {}
+        for token, surface in tokenize_with_surface(query):
+            query_terms.setdefault(token, surface)
+
+        with self._lock:
+            count = self._live_count
+            if count == 0 or not query_terms or not len(doc_ids):
+                return []
+            position_of = np.full(self._doc_count, -1, dtype=np.int64)
+            position_of[doc_ids] = np.arange(len(doc_ids))
+
+            avg_len = self._total_len / count or 1.0
+            scores = np.zeros(self._doc_count, dtype=np.float32)
+            term_docs = {}
+            for term in query_terms:
+                docs, tfs = self._posting_array(term)
+                df = self._df.get(term, 0)
+                if not df:
+                    continue
+                idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+                keep = position_of[docs] >= 0
+                docs, tfs = docs[keep], tfs[keep]
+                norm = self.k1 * (1 - self.b + self.b * self._doc_len[docs] / avg_len)
+                scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+                term_docs[term] = docs
+                self.stats['postings_scored'] += len(docs)
+            self.stats['searches'] += 1
+
+            matched = np.flatnonzero(scores > 0)
+            if not len(matched):
+                return []
+            k = min(k, len(matched))
+            top = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+            top = top[np.argsort(-scores[top], kind='stable')]
+
+            results = []
+            for doc_id in top.tolist():
+                # Posting lists are in insertion order, so doc ids are sorted
+                words = [
+                    query_terms[term] for term, docs in term_docs.items()
+                    if docs[min(np.searchsorted(docs, doc_id), len(docs) - 1)] == doc_id
+                ]
+                results.append((int(position_of[doc_id]), float(scores[doc_id]), words))
+            return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return document, term and search counters."""
+        with self._lock:
+            return dict(self.stats, documents=self._live_count, keys=len(self._docs), terms=len(self._postings))
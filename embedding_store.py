@@ -0,0 +1,329 @@
+"""
+Storage for message embeddings used by the semantic search engine.
+Vectors are L2-normalized once on insert and stored quantized: float16, or
+int8 with a per-vector scale, so similarity is a plain dot product.
+Hot vectors live in one contiguous preallocated matrix with an index map, so
+the cache has a fixed memory footprint regardless of how long the server runs.
+Every embedding is also appended to an on-disk store that is memory-mapped at
+startup, so restarts begin warm and worker processes share the same pages.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process appends only
+    fcntl = None
+
+EmbeddingKey = Tuple[str, str, str]
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Return float32 copies of the rows scaled to unit length (zero rows stay zero)."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def quantize_rows(vectors: np.ndarray, dtype: np.dtype) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    L2-normalize rows and convert them to the storage dtype.
+    int8 rows are scaled so their largest component maps to 127; the per-row
+    scales are returned alongside (None for float dtypes).
+    """
+    unit = normalize_rows(vectors)
+    if np.dtype(dtype) == np.int8:
+        scales = np.abs(unit).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        return np.round(unit / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+    return unit.astype(dtype), None
+
+
+def dequantize_rows(rows: np.ndarray, scales: Optional[np.ndarray] = None) -> np.ndarray:
+    """Convert stored rows back to float32 vectors."""
+    vectors = np.asarray(rows, dtype=np.float32)
+    if scales is not None:
+        vectors = vectors * np.asarray(scales, dtype=np.float32)[:, None]
+    return vectors
+
+
+def score_rows(rows: np.ndarray, scales: Optional[np.ndarray], query: np.ndarray, chunk: int = 8192) -> np.ndarray:
+    """Dot product of every stored row with a float32 query, converting in cache-sized chunks."""
+    scores = np.empty(len(rows), dtype=np.float32)
+    for start in range(0, len(rows), chunk):
+        block = np.asarray(rows[start:start + chunk], dtype=np.float32) @ query
+        if scales is not None:
+            block *= scales[start:start + chunk]
+        scores[start:start + chunk] = block
+    return scores
+
+
+# Recently computed keys per (channel, ts), with the in-process hash of the text they were built from.
+# Bounded LRU so the memo doesn't grow with the whole message history.
+KEY_MEMO_SIZE = int(os.getenv('EMBEDDING_KEY_MEMO_SIZE', '50000'))
+_key_memo: 'OrderedDict[Tuple[str, str], Tuple[int, EmbeddingKey]]' = OrderedDict()
+_key_memo_lock = threading.Lock()
+
+
+def embedding_key(message: Dict[str, Any]) -> EmbeddingKey:
+    """Key an embedding by channel, timestamp and text so edits and cross-channel ts never collide."""
+    text = message.get('text', '')
+    ident = (message.get('channel_id', ''), message.get('ts', ''))
+    # Skip the SHA-1 when this message was keyed recently with the same text
+    with _key_memo_lock:
+        memo = _key_memo.get(ident)
+        if memo is not None and memo[0] == hash(text):
+            _key_memo.move_to_end(ident)
+            return memo[1]
+    text_hash = hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+    key = ident + (text_hash,)
+    with _key_memo_lock:
+        _key_memo[ident] = (hash(text), key)
+        _key_memo.move_to_end(ident)
+        if len(_key_memo) > KEY_MEMO_SIZE:
+            _key_memo.popitem(last=False)
+    return key
+
+
+class EmbeddingCache:
+    """Bounded LRU cache of embeddings backed by a single preallocated matrix."""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, dtype: str = 'float16'):
+        self.max_bytes = max_bytes
+        self.dtype = np.dtype(dtype)
+        self.capacity = 0
+        self.matrix: Optional[np.ndarray] = None
+        self.scales: Optional[np.ndarray] = None
+        self._slots: 'OrderedDict[EmbeddingKey, int]' = OrderedDict()
+        self._free: List[int] = []
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def _allocate(self, dim: int):
+        """Preallocate the backing matrix once the embedding dimension is known."""
+        quantized = self.dtype == np.int8
+        row_bytes = dim * self.dtype.itemsize + (4 if quantized else 0)
+        self.capacity = max(1, self.max_bytes // row_bytes)
+        self.matrix = np.zeros((self.capacity, dim), dtype=self.dtype)
+        self.scales = np.ones(self.capacity, dtype=np.float32) if quantized else None
+        self._free = list(range(self.capacity - 1, -1, -1))
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, key: EmbeddingKey) -> bool:
+        return key in self._slots
+
+    def get_many(self, keys: List[EmbeddingKey], dim: Optional[int] = None) -> Tuple[Optional[np.ndarray], List[int]]:
+        """
+        Look up embeddings for keys.
+        Returns a float32 matrix with one row per key (zeros for misses) and the
+        positions of the missing keys. The matrix is None if nothing is cached yet
+        and no dim was given.
+        """
+        with self._lock:
+            if self.matrix is None and dim is None:
+                self.stats['misses'] += len(keys)
+                return None, list(range(len(keys)))
+
+            width = self.matrix.shape[1] if self.matrix is not None else dim
+            vectors = np.zeros((len(keys), width), dtype=np.float32)
+            missing, found, slots = [], [], []
+            for position, key in enumerate(keys):
+                slot = self._slots.get(key)
+                if slot is None:
+                    missing.append(position)
+                    continue
+                self._slots.move_to_end(key)
+                found.append(position)
+                slots.append(slot)
+            if found:
+                vectors[found] = dequantize_rows(
+                    self.matrix[slots], self.scales[slots] if self.scales is not None else None
+                )
+            self.stats['hits'] += len(found)
+            self.stats['misses'] += len(missing)
+            return vectors, missing
+
+    def put_many(self, keys: List[EmbeddingKey], vectors: np.ndarray):
+        """Store embeddings, evicting the least recently used entries when full."""
+        rows, scales = quantize_rows(vectors, self.dtype)
+        with self._lock:
+            if self.matrix is None:
+                self._allocate(vectors.shape[1])
+            for i, key in enumerate(keys):
+                slot = self._slots.get(key)
+                if slot is None:
+                    if self._free:
+                        slot = self._free.pop()
+                    else:
+                        _, slot = self._slots.popitem(last=False)
+                        self.stats['evictions'] += 1
+                    self._slots[key] = slot
+                else:
+                    self._slots.move_to_end(key)
+                self.matrix[slot] = rows[i]
+                if scales is not None:
+                    self.scales[slot] = scales[i]
+
+    def clear(self):
+        """Drop every cached embedding while keeping the allocation."""
+        with self._lock:
+            self._slots.clear()
+            self._free = list(range(self.capacity - 1, -1, -1))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return cache counters, size and memory footprint."""
+        with self._lock:
+            nbytes = self.matrix.nbytes if self.matrix is not None else 0
+            nbytes += self.scales.nbytes if self.scales is not None else 0
+            return dict(self.stats, size=len(self._slots), capacity=self.capacity, bytes=nbytes)
+
+
+class PersistentEmbeddingStore:
+    """
+    Append-only on-disk embedding store.
+    Vectors are raw rows in embeddings.bin, mapped read-only with np.memmap;
+    embeddings.ids is a sidecar with one JSON key per row, and embeddings.json
+    records the dimension and dtype. int8 stores keep per-row float32 scales
+    in embeddings.scales.
+    """
+
+    def __init__(self, directory: str, dtype: str = 'float16'):
+        self.directory = directory
+        self.vectors_path = os.path.join(directory, 'embeddings.bin')
+        self.ids_path = os.path.join(directory, 'embeddings.ids')
+        self.meta_path = os.path.join(directory, 'embeddings.json')
+        self.scales_path = os.path.join(directory, 'embeddings.scales')
+        self.dtype = np.dtype(dtype)
+        self.dim: Optional[int] = None
+        self._index: Dict[EmbeddingKey, int] = {}
+        self._rows = 0
+        self._ids_offset = 0
+        self._map: Optional[np.memmap] = None
+        self._scales_map: Optional[np.memmap] = None
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0}
+
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            self._catch_up()
+
+    def _load_meta(self) -> bool:
+        if self.dim is not None:
+            return True
+        if not os.path.exists(self.meta_path):
+            return False
+        with open(self.meta_path) as f:
+            meta = json.load(f)
+        self.dim = meta['dim']
+        self.dtype = np.dtype(meta['dtype'])
+        return True
+
+    def _catch_up(self):
+        """Index rows appended since the last check, including appends from other processes. Caller holds the lock."""
+        if not self._load_meta() or not os.path.exists(self.ids_path):
+            return
+        rows_on_disk = os.path.getsize(self.vectors_path) // (self.dim * self.dtype.itemsize)
+        if self._quantized:
+            scales_size = os.path.getsize(self.scales_path) if os.path.exists(self.scales_path) else 0
+            rows_on_disk = min(rows_on_disk, scales_size // 4)
+        with open(self.ids_path, 'rb') as f:
+            f.seek(self._ids_offset)
+            for line in f:
+                # Only trust ids whose vector row has been fully written
+                if not line.endswith(b'\n') or self._rows >= rows_on_disk:
+                    break
+                self._index[tuple(json.loads(line))] = self._rows
+                self._rows += 1
+                self._ids_offset += len(line)
+
+    @property
+    def _quantized(self) -> bool:
+        return self.dtype == np.int8
+
+    def _vectors(self) -> np.memmap:
+        """Return a read-only mapping covering every indexed row. Caller holds the lock."""
+        if self._map is None or self._map.shape[0] < self._rows:
+            self._map = np.memmap(self.vectors_path, dtype=self.dtype, mode='r', shape=(self._rows, self.dim))
+        return self._map
+
+    def _scales(self) -> Optional[np.memmap]:
+        """Return a read-only mapping of the per-row scales of an int8 store. Caller holds the lock."""
+        if not self._quantized:
+            return None
+        if self._scales_map is None or self._scales_map.shape[0] < self._rows:
+            self._scales_map = np.memmap(self.scales_path, dtype=np.float32, mode='r', shape=(self._rows,))
+        return self._scales_map
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def get_many(self, keys: List[EmbeddingKey]) -> Tuple[List[int], Optional[np.ndarray]]:
+        """Return the positions of keys found on disk and their vectors as float32."""
+        with self._lock:
+            found = [position for position, key in enumerate(keys) if key in self._index]
+            if len(found) < len(keys):
+                self._catch_up()
+                found = [position for position, key in enumerate(keys) if key in self._index]
+            self.stats['hits'] += len(found)
+            self.stats['misses'] += len(keys) - len(found)
+            if not found:
+                return [], None
+            rows = [self._index[keys[position]] for position in found]
+            scales = self._scales()
+            return found, dequantize_rows(self._vectors()[rows], scales[rows] if scales is not None else None)
+
+    def put_many(self, keys: List[EmbeddingKey], vectors: np.ndarray):
+        """Append embeddings for keys that are not stored yet."""
+        with self._lock:
+            lock_file = open(self.meta_path + '.lock', 'a')
+            try:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                if not self._load_meta():
+                    self.dim = int(vectors.shape[1])
+                    with open(self.meta_path, 'w') as f:
+                        json.dump({'dim': self.dim, 'dtype': self.dtype.name}, f)
+                self._catch_up()
+
+                new_keys, new_rows, seen = [], [], set()
+                for key, vector in zip(keys, vectors):
+                    if key not in self._index and key not in seen:
+                        seen.add(key)
+                        new_keys.append(key)
+                        new_rows.append(vector)
+                if not new_keys:
+                    return
+                rows, scales = quantize_rows(np.asarray(new_rows), self.dtype)
+
+                # Vectors (and scales) are written before ids so readers never index a partial row;
+                # truncating first discards anything left behind by an interrupted append
+                with open(self.vectors_path, 'ab') as f:
+                    f.truncate(self._rows * self.dim * self.dtype.itemsize)
+                    f.write(rows.tobytes())
+                if scales is not None:
+                    with open(self.scales_path, 'ab') as f:
+                        f.truncate(self._rows * 4)
+                        f.write(scales.tobytes())
+                with open(self.ids_path, 'ab') as f:
+                    f.truncate(self._ids_offset)
+                    f.write(b''.join(json.dumps(list(key)).encode('utf-8') + b'\n' for key in new_keys))
+                self._catch_up()
+                self.stats['writes'] += len(new_keys)
+            finally:
+                lock_file.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return store counters and size."""
+        with self._lock:
+            nbytes = self._rows * ((self.dim or 0) * self.dtype.itemsize + (4 if self._quantized else 0))
+            return dict(self.stats, size=self._rows, bytes=nbytes)
@@ -4,14 +4,26 @@ A simple MCP server implementation using fastMCP.
 This server provides basic tools for file operations, system information, calculations, and Slack integration.
 """
 
+import argparse
+import asyncio
+import contextvars
+import functools
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Union
 
 from fastmcp import FastMCP
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
+from slack_sdk.web.async_client import AsyncWebClient
 from ai_search import search_engine
+from slack_scheduler import scheduler, ScheduledWebClient, ScheduledAsyncWebClient
+from slack_pagination import PAGE_SIZES, iter_items, aiter_items
+from slack_cache import user_directory, channel_directory
+from message_store import message_store
+from sync_worker import sync_worker
+from metrics import registry, TOOL_SECONDS, STAGE_SECONDS
 
 # Debug logging (disabled for production)
 # import logging
@@ -20,36 +32,114 @@ from ai_search import search_engine
 # Initialize the MCP server
 mcp = FastMCP("Simple MCP Server")
 
-# Global Slack client - initialized when needed
+# Global Slack clients - initialized when needed
 _slack_client = None
+_async_slack_client = None
 
-def get_slack_client() -> Optional[WebClient]:
-    """Get initialized Slack client."""
-    global _slack_client
+# Maximum number of Slack requests in flight during an async fan-out
+SLACK_FETCH_CONCURRENCY = int(os.getenv('SLACK_FETCH_CONCURRENCY', '10'))
+
+# Thread replies fetched per channel when a tool syncs it; draining the rest is left to the background worker
+SLACK_REQUEST_THREADS = int(os.getenv('SLACK_REQUEST_THREADS', '2'))
+
+# Stale channels a message search syncs before answering, least recently synced first;
+# the others are answered from the store as last synced
+SLACK_SEARCH_SYNC_CHANNELS = int(os.getenv('SLACK_SEARCH_SYNC_CHANNELS', '10'))
+
+# Worker pool for blocking Slack and model calls, so one slow call doesn't stall other clients
+SLACK_WORKER_THREADS = int(os.getenv('SLACK_WORKER_THREADS', '16'))
+_worker_pool = ThreadPoolExecutor(max_workers=SLACK_WORKER_THREADS, thread_name_prefix='slack-worker')
+
+# Separate pool for the channel syncs a search tool fans out from inside a worker thread
+_sync_pool = ThreadPoolExecutor(max_workers=SLACK_FETCH_CONCURRENCY, thread_name_prefix='slack-sync')
+
+async def run_blocking(fn, *args, **kwargs):
+    """Run a blocking call in the worker pool, keeping the caller's context (e.g. its scheduler lane)."""
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        _worker_pool, functools.partial(context.run, fn, *args, **kwargs)
+    )
+
+def offload(fn):
+    """Expose a blocking tool as a coroutine that runs in the worker pool, timing each call."""
+    timed_fn = TOOL_SECONDS.time(tool=fn.__name__)(fn)
+    
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await run_blocking(timed_fn, *args, **kwargs)
+    return wrapper
+
+def get_slack_client(async_client: bool = False) -> Optional[Union[WebClient, AsyncWebClient]]:
+    """Get initialized Slack client, or its asyncio variant when async_client is True."""
+    global _slack_client, _async_slack_client
+    token = os.getenv('SLACK_BOT_TOKEN')
+    # SLACK_API_BASE_URL points the clients at a proxy or the local benchmark server
+    base_url = os.getenv('SLACK_API_BASE_URL', WebClient.BASE_URL)
+    if async_client:
+        if _async_slack_client is None:
+            if not token:
+                return None
+            _async_slack_client = ScheduledAsyncWebClient(token=token, base_url=base_url, scheduler=scheduler)
+        return _async_slack_client
     if _slack_client is None:
-        token = os.getenv('SLACK_BOT_TOKEN')
         if not token:
             return None
-        _slack_client = WebClient(token=token)
+        _slack_client = ScheduledWebClient(token=token, base_url=base_url, scheduler=scheduler)
     return _slack_client
 
+@STAGE_SECONDS.time(stage='fetch_histories')
+async def fetch_channel_histories(client: AsyncWebClient, channel_ids: List[str], limit: int) -> List[Dict[str, Any]]:
+    """Sync several channels concurrently and return their recent history, tagging each message with its channel."""
+    semaphore = asyncio.Semaphore(SLACK_FETCH_CONCURRENCY)
+    
+    async def fetch(ch_id: str) -> List[Dict[str, Any]]:
+        async with semaphore:
+            try:
+                channel_name = await channel_directory.aname(client, ch_id)
+                # Channels the background worker keeps current are read straight from the store;
+                # other channels sync their history and only a few thread replies here
+                if not sync_worker.is_fresh(ch_id):
+                    await message_store.async_sync_channel(
+                        client, ch_id, thread_limit=SLACK_REQUEST_THREADS, run_blocking=run_blocking
+                    )
+            except SlackApiError:
+                # Skip channels we don't have access to and forget their cached metadata
+                channel_directory.invalidate(ch_id)
+                return []
+            except Exception:
+                # Skip any other errors for individual channels
+                return []
+        
+        # Store reads wait on the SQLite lock, which the background worker holds during large inserts
+        messages = await run_blocking(message_store.get_messages, ch_id, limit=limit)
+        for msg in messages:
+            msg['channel_id'] = ch_id
+            msg['channel_name'] = channel_name
+        return messages
+    
+    # Keep channel order stable regardless of which request finishes first
+    per_channel = await asyncio.gather(*(fetch(ch_id) for ch_id in channel_ids))
+    return [msg for messages in per_channel for msg in messages]
 
 
 
 
 
 
-@mcp.tool()
-def slack_list_channels() -> str:
+
+def _list_channels() -> str:
     """List all Slack channels the bot has access to."""
     client = get_slack_client()
     if not client:
         return "Error: Slack client not initialized. Please set SLACK_BOT_TOKEN environment variable."
     
     try:
-        # Get public channels
-        result = client.conversations_list(types="public_channel,private_channel")
-        channels = result["channels"]
+        # Get public and private channels across every page
+        channels = list(iter_items(
+            client.conversations_list, "channels", PAGE_SIZES["conversations.list"],
+            types="public_channel,private_channel"
+        ))
+        channel_directory.seed(channels)
         
         if not channels:
             return "No channels found or bot doesn't have access to any channels."
@@ -67,6 +157,13 @@ def slack_list_channels() -> str:
         return f"Error listing channels: {str(e)}"
 
 @mcp.tool()
+@offload
+def slack_list_channels() -> str:
+    """List all Slack channels the bot has access to."""
+    return _list_channels()
+
+@mcp.tool()
+@offload
 def slack_get_channel_messages(channel_id: str, limit: int = 10) -> str:
     """Get recent messages from a Slack channel."""
     client = get_slack_client()
@@ -77,9 +174,8 @@ def slack_get_channel_messages(channel_id: str, limit: int = 10) -> str:
         # Limit to reasonable number of messages
         limit = min(limit, 50)
         
-        # Get channel info first
-        channel_info = client.conversations_info(channel=channel_id)
-        channel_name = channel_info["channel"]["name"]
+        # Get channel name from the shared directory
+        channel_name = channel_directory.name(client, channel_id)
         
         # Get messages
         result = client.conversations_history(channel=channel_id, limit=limit)
@@ -88,6 +184,9 @@ def slack_get_channel_messages(channel_id: str, limit: int = 10) -> str:
         if not messages:
             return f"No messages found in #{channel_name}."
         
+        # Threads whose latest_reply moved get their replies fetched on the next store sync
+        message_store.record_threads(channel_id, messages)
+        
         output = f"Recent messages from #{channel_name} (showing {len(messages)} messages):\n\n"
         
         for msg in reversed(messages):  # Show oldest first
@@ -95,12 +194,8 @@ def slack_get_channel_messages(channel_id: str, limit: int = 10) -> str:
             user_id = msg.get("user", "Unknown")
             text = msg.get("text", "")
             
-            # Get user info if possible
-            try:
-                user_info = client.users_info(user=user_id)
-                username = user_info["user"]["real_name"] or user_info["user"]["name"]
-            except:
-                username = user_id
+            # Resolve user name from the shared directory
+            username = user_directory.display_name(client, user_id)
             
             # Handle different message types
             if msg.get("subtype") == "bot_message":
@@ -109,7 +204,9 @@ def slack_get_channel_messages(channel_id: str, limit: int = 10) -> str:
             output += f"[{timestamp}] {username}: {text}\n"
             
             # Add thread info if it's a thread
-            if msg.get("thread_ts"):
+            if msg.get("reply_count") and msg.get("thread_ts") == msg["ts"]:
+                output += f"  └─ (thread with {msg['reply_count']} replies)\n"
+            elif msg.get("thread_ts"):
                 output += "  └─ (part of thread)\n"
         
         return output
@@ -119,6 +216,7 @@ def slack_get_channel_messages(channel_id: str, limit: int = 10) -> str:
         return f"Error getting messages: {str(e)}"
 
 @mcp.tool()
+@offload
 def slack_search_messages(query: str, channel_id: Optional[str] = None, limit: int = 10) -> str:
     """Search for messages in Slack channels (fallback implementation without search:read scope)."""
     client = get_slack_client()
@@ -133,67 +231,66 @@ def slack_search_messages(query: str, channel_id: Optional[str] = None, limit: i
         if channel_id:
             channels_to_search = [channel_id]
         else:
-            # Get list of channels the bot has access to
+            # Get every unarchived channel the bot is a member of
             try:
-                channels_result = client.conversations_list(types="public_channel,private_channel", limit=20)
-                channels_to_search = [ch["id"] for ch in channels_result["channels"]]
+                channels = list(iter_items(
+                    client.conversations_list, "channels", PAGE_SIZES["conversations.list"],
+                    types="public_channel,private_channel", exclude_archived=True
+                ))
+                channel_directory.seed(channels)
+                channels_to_search = [ch["id"] for ch in channels if ch.get("is_member", True)]
             except:
                 return "Error: Unable to access channels. Bot needs to be invited to channels."
         
-        matches = []
-        query_lower = query.lower()
-        
-        # Search through channel histories
+        channel_names = {}
         for ch_id in channels_to_search:
             try:
-                # Get channel name
-                channel_info = client.conversations_info(channel=ch_id)
-                channel_name = channel_info["channel"]["name"]
-                
-                # Get recent messages from this channel
-                result = client.conversations_history(channel=ch_id, limit=50)
-                messages = result["messages"]
-                
-                # Search for query in messages
-                for msg in messages:
-                    text = msg.get("text", "").lower()
-                    if query_lower in text:
-                        # Get user info
-                        user_id = msg.get("user", "Unknown")
-                        try:
-                            user_info = client.users_info(user=user_id)
-                            username = user_info["user"]["real_name"] or user_info["user"]["name"]
-                        except:
-                            username = user_id
-                        
-                        matches.append({
-                            "timestamp": msg["ts"],
-                            "channel": channel_name,
-                            "username": username,
-                            "text": msg.get("text", "")
-                        })
-                        
-                        if len(matches) >= limit:
-                            break
-                            
+                channel_names[ch_id] = channel_directory.name(client, ch_id)
             except SlackApiError as api_error:
-                # Skip channels we don't have access to
+                # Skip channels we don't have access to and forget their cached metadata
+                channel_directory.invalidate(ch_id)
                 continue
             except Exception:
                 # Skip any other errors for individual channels
                 continue
+        
+        # Bring the stalest channels being searched up to date concurrently
+        stale = [ch_id for ch_id in channel_names if not sync_worker.is_fresh(ch_id)]
+        futures = {
+            ch_id: _sync_pool.submit(
+                contextvars.copy_context().run, message_store.sync_channel, client, ch_id,
+                thread_limit=SLACK_REQUEST_THREADS
+            )
+            for ch_id in message_store.least_recently_synced(stale)[:SLACK_SEARCH_SYNC_CHANNELS]
+        }
+        for ch_id, future in futures.items():
+            try:
+                future.result()
+            except SlackApiError:
+                channel_directory.invalidate(ch_id)
+                channel_names.pop(ch_id, None)
+            except Exception:
+                channel_names.pop(ch_id, None)
+        
+        # Answer the query from the inverted index; results come back newest first
+        matches = []
+        for msg in message_store.search(query, list(channel_names), limit):
+            # Resolve user name
+            user_id = msg.get("user", "Unknown")
+            username = user_directory.display_name(client, user_id)
             
-            if len(matches) >= limit:
-                break
+            matches.append({
+                "timestamp": msg["ts"],
+                "channel": channel_names[msg["channel_id"]],
+                "username": username,
+                "text": msg.get("text", "")
+            })
         
         if not matches:
             return f"No messages found matching '{query}'. Note: Bot can only search channels it has been invited to."
         
         output = f"Search results for '{query}' (showing {len(matches)} results):\n\n"
         
-        # Sort by timestamp (newest first)
-        matches.sort(key=lambda x: float(x["timestamp"]), reverse=True)
-        
         for match in matches:
             timestamp = datetime.fromtimestamp(float(match["timestamp"])).strftime("%Y-%m-%d %H:%M:%S")
             output += f"[{timestamp}] #{match['channel']} - {match['username']}: {match['text']}\n\n"
@@ -207,6 +304,7 @@ def slack_search_messages(query: str, channel_id: Optional[str] = None, limit: i
         return f"Error searching messages: {str(e)}"
 
 @mcp.tool()
+@offload
 def slack_get_user_info(user_id: str) -> str:
     """Get information about a Slack user."""
     client = get_slack_client()
@@ -214,8 +312,9 @@ def slack_get_user_info(user_id: str) -> str:
         return "Error: Slack client not initialized. Please set SLACK_BOT_TOKEN environment variable."
     
     try:
-        result = client.users_info(user=user_id)
-        user = result["user"]
+        user = user_directory.get(client, user_id)
+        if not user:
+            return "Slack API error: user_not_found"
         
         output = f"User Information for {user['name']}:\n"
         output += f"Real Name: {user.get('real_name', 'N/A')}\n"
@@ -234,6 +333,7 @@ def slack_get_user_info(user_id: str) -> str:
         return f"Error getting user info: {str(e)}"
 
 @mcp.tool()
+@offload
 def slack_send_message(channel_id: str, text: str) -> str:
     """Send a message to a Slack channel."""
     client = get_slack_client()
@@ -249,7 +349,8 @@ def slack_send_message(channel_id: str, text: str) -> str:
         return f"Error sending message: {str(e)}"
 
 @mcp.tool()
-def slack_smart_search(query: str, channel_id: Optional[str] = None, max_results: int = 10, include_summary: bool = True) -> str:
+@TOOL_SECONDS.time(tool='slack_smart_search')
+async def slack_smart_search(query: str, channel_id: Optional[str] = None, max_results: int = 10, include_summary: bool = True) -> str:
     """
     Search Slack messages using natural language queries with AI-powered understanding.
     
@@ -260,52 +361,58 @@ def slack_smart_search(query: str, channel_id: Optional[str] = None, max_results
     - "Show me concerns people raised about performance"
     """
     client = get_slack_client()
-    if not client:
+    async_client = get_slack_client(async_client=True)
+    if not client or not async_client:
         return "Error: Slack client not initialized. Please set SLACK_BOT_TOKEN environment variable."
     
     try:
-        # Parse natural language query
-        search_params = search_engine.parse_natural_query(query)
+        # Parse natural language query (blocking LLM call, keep it off the event loop) while
+        # channel histories are prefetched; the fetch only depends on the parse for channel hints
+        parse_task = asyncio.ensure_future(run_blocking(search_engine.parse_natural_query, query))
         
         # Determine channels to search
         if channel_id:
             channels_to_search = [channel_id]
         else:
-            # Get accessible channels
+            # Get the first channels the bot is a member of, paging until enough are found
             try:
-                channels_result = client.conversations_list(types="public_channel,private_channel", limit=20)
-                channels_to_search = [ch["id"] for ch in channels_result["channels"]][:10]  # Limit for performance
+                channels_to_search = []
+                with STAGE_SECONDS.time(stage='discover_channels'):
+                    async for ch in aiter_items(
+                        async_client.conversations_list, "channels", PAGE_SIZES["conversations.list"],
+                        types="public_channel,private_channel", exclude_archived=True
+                    ):
+                        channel_directory.seed([ch])
+                        if ch.get("is_member", True):
+                            channels_to_search.append(ch["id"])
+                        if len(channels_to_search) >= 10:  # Limit for performance
+                            break
             except:
                 return "Error: Unable to access channels. Bot needs to be invited to channels."
         
-        # Collect messages from channels
-        all_messages = []
-        channel_names = {}
-        
-        for ch_id in channels_to_search:
-            try:
-                # Get channel info
-                channel_info = client.conversations_info(channel=ch_id)
-                channel_name = channel_info["channel"]["name"]
-                channel_names[ch_id] = channel_name
-                
-                # Get messages (more for better search results)
-                result = client.conversations_history(channel=ch_id, limit=100)
-                messages = result["messages"]
-                
-                # Add channel context to messages
-                for msg in messages:
-                    msg['channel_id'] = ch_id
-                    msg['channel_name'] = channel_name
-                
-                all_messages.extend(messages)
-                
-            except SlackApiError:
-                # Skip channels we don't have access to
-                continue
-            except Exception:
-                # Skip any other errors for individual channels
-                continue
+        # Collect messages from channels concurrently, overlapping with query parsing
+        fetch_task = asyncio.ensure_future(fetch_channel_histories(async_client, channels_to_search, limit=100))
+        search_params, all_messages = await asyncio.gather(parse_task, fetch_task)
+        
+        # Narrow to channels named in the query, fetching any that were not prefetched
+        if not channel_id and search_params.channel_hints:
+            hinted_channels = channel_directory.find_by_names(search_params.channel_hints)
+            if hinted_channels:
+                extra_channels = [ch_id for ch_id in hinted_channels if ch_id not in channels_to_search]
+                if extra_channels:
+                    all_messages += await fetch_channel_histories(async_client, extra_channels, limit=100)
+                all_messages = [msg for msg in all_messages if msg['channel_id'] in hinted_channels]
+                channels_to_search = list(hinted_channels)
+        
+        # Add older messages the background worker indexed, retrieved from the ANN index
+        search_query = ' '.join(search_params.keywords) if search_params.keywords else query
+        indexed_keys = await run_blocking(
+            search_engine.index_candidates, search_query, channels_to_search, search_engine.hybrid_candidates
+        )
+        fetched_keys = {(msg['channel_id'], msg['ts']) for msg in all_messages}
+        older_keys = [key for key in indexed_keys if key not in fetched_keys]
+        if older_keys:
+            all_messages += await run_blocking(message_store.get_many, older_keys)
         
         if not all_messages:
             return f"No messages found. Bot may need to be invited to channels first."
@@ -316,11 +423,10 @@ def slack_smart_search(query: str, channel_id: Optional[str] = None, max_results
         
         # Apply user filtering
         if search_params.user_filter:
-            all_messages = search_engine.filter_by_user(all_messages, search_params.user_filter, client)
+            all_messages = await run_blocking(search_engine.filter_by_user, all_messages, search_params.user_filter, client)
         
         # Perform semantic search
-        search_query = ' '.join(search_params.keywords) if search_params.keywords else query
-        results = search_engine.semantic_search(search_query, all_messages, max_results)
+        results = await run_blocking(search_engine.semantic_search, search_query, all_messages, max_results)
         
         if not results:
             return f"No messages found matching '{query}'. Try different keywords or check if bot has access to relevant channels."
@@ -338,7 +444,7 @@ def slack_smart_search(query: str, channel_id: Optional[str] = None, max_results
         
         # Add AI summary if requested
         if include_summary and len(results) > 1:
-            summary = search_engine.generate_summary(results, query)
+            summary = await run_blocking(search_engine.generate_summary, results, query)
             output += f"💡 **Summary**: {summary}\n\n"
         
         # Show search parameters if extracted
@@ -353,6 +459,13 @@ def slack_smart_search(query: str, channel_id: Optional[str] = None, max_results
                 filters.append(f"Type: {search_params.content_type}")
             output += ", ".join(filters) + "\n\n"
         
+        # Resolve all authors in one pass off the event loop
+        user_ids = {result['message'].get("user", "Unknown") for result in results[:max_results]}
+        with STAGE_SECONDS.time(stage='resolve_users'):
+            usernames = await run_blocking(
+                lambda: {uid: user_directory.display_name(client, uid) for uid in user_ids}
+            )
+        
         # Show results
         output += "📝 **Messages**:\n"
         for i, result in enumerate(results[:max_results], 1):
@@ -365,12 +478,7 @@ def slack_smart_search(query: str, channel_id: Optional[str] = None, max_results
             user_id = msg.get("user", "Unknown")
             text = msg.get("text", "")[:300] + ("..." if len(msg.get("text", "")) > 300 else "")
             
-            # Get user info
-            try:
-                user_info = client.users_info(user=user_id)
-                username = user_info["user"]["real_name"] or user_info["user"]["name"]
-            except:
-                username = user_id
+            username = usernames[user_id]
             
             output += f"\n**{i}.** [{timestamp}] **#{channel}** - {username}\n"
             output += f"    {text}\n"
@@ -390,21 +498,89 @@ def slack_smart_search(query: str, channel_id: Optional[str] = None, max_results
 
 
 @mcp.resource("slack://{resource_type}")
+@offload
 def get_slack_resource(resource_type: str) -> str:
     """Get Slack information as a resource."""
     if resource_type == "channels":
-        return slack_list_channels()
+        return _list_channels()
     elif resource_type == "status":
         client = get_slack_client()
         if client:
-            return "Slack client initialized and ready"
+            output = "Slack client initialized and ready\n"
         else:
-            return "Slack client not initialized - set SLACK_BOT_TOKEN"
+            output = "Slack client not initialized - set SLACK_BOT_TOKEN\n"
+        status = search_engine.component_status
+        output += f"AI search {search_engine.readiness()}: "
+        output += f"LLM {status['llm']}, embedding model {status['embedding_model']}"
+        return output
+    elif resource_type == "cache":
+        stats = user_directory.get_stats()
+        output = "Slack cache statistics:\n"
+        output += f"Users: {stats['size']} cached, {stats['hits']} hits, {stats['misses']} misses, "
+        output += f"{stats['refreshes']} refreshes, {stats['api_calls']} API calls\n"
+        stats = channel_directory.get_stats()
+        output += f"Channels: {stats['size']} cached, {stats['hits']} hits, {stats['misses']} misses, "
+        output += f"{stats['invalidations']} invalidations, {stats['api_calls']} API calls\n"
+        stats = message_store.get_stats()
+        output += f"Messages: {stats['messages']} stored across {stats['channels']} channels, {stats['syncs']} syncs, "
+        output += f"{stats['skipped_syncs']} skipped syncs, {stats['api_calls']} API calls\n"
+        stats = search_engine.embeddings_cache.get_stats()
+        output += f"Embeddings: {stats['size']}/{stats['capacity']} cached ({stats['bytes'] / 1024 / 1024:.1f} MB), "
+        output += f"{stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions\n"
+        if search_engine.embedding_store is not None:
+            stats = search_engine.embedding_store.get_stats()
+            output += f"Embedding store: {stats['size']} on disk ({stats['bytes'] / 1024 / 1024:.1f} MB), "
+            output += f"{stats['hits']} hits, {stats['misses']} misses, {stats['writes']} writes\n"
+        stats = search_engine.ann_index.get_stats()
+        output += f"ANN index: {stats['size']} {stats['dtype']} vectors ({stats['bytes'] / 1024 / 1024:.1f} MB) "
+        output += f"in {stats['nlist']} clusters (nprobe {stats['nprobe']}), "
+        output += f"{stats['searches']} searches, {stats['scored']} vectors scored\n"
+        stats = search_engine.bm25_index.get_stats()
+        output += f"Keyword index: {stats['documents']} documents, {stats['terms']} terms, {stats['searches']} searches\n"
+        stats = search_engine.query_cache.get_stats()
+        output += f"Query parses: {stats['size']} cached, {stats['hits']} hits, {stats['misses']} misses\n"
+        stats = search_engine.summary_cache.get_stats()
+        output += f"Summaries: {stats['size']} cached, {stats['hits']} hits, {stats['misses']} misses\n"
+        return output
+    elif resource_type == "sync":
+        stats = sync_worker.get_stats()
+        output = f"Background sync worker {'running' if stats['running'] else 'stopped'}: "
+        output += f"{stats['rounds']} rounds, {stats['syncs']} channel syncs, {stats['api_calls']} API calls, "
+        output += f"{stats['embedded']} messages embedded, {stats['errors']} errors, "
+        output += f"{stats['budget_wait_seconds']:.1f}s waiting for budget\n"
+        channels = sorted(stats['channels'].items(), key=lambda item: -(float('inf') if item[1]['lag'] is None else item[1]['lag']))
+        for channel_id, state in channels:
+            lag = f"{state['lag']:.0f}s behind" if state['lag'] is not None else "never synced"
+            output += f"#{state['name']}: {lag}, {state['embedded']} embedded"
+            if state['error']:
+                output += f", last error: {state['error']}"
+            output += "\n"
+        return output
+    elif resource_type == "metrics":
+        output = "# Stage latency breakdown\n"
+        output += "".join(f"# {line}\n" for line in registry.breakdown().splitlines())
+        output += registry.render()
+        return output
+    elif resource_type == "scheduler":
+        stats = scheduler.get_stats()
+        output = "Slack request scheduler:\n"
+        output += f"Queue depth: {stats['queue_depth']['interactive']} interactive, {stats['queue_depth']['background']} background\n"
+        for method, method_stats in sorted(stats['methods'].items()):
+            output += f"{method}: {method_stats['calls']} calls, {method_stats['waits']} waits "
+            output += f"({method_stats['wait_seconds']:.1f}s), {method_stats['rate_limited']} rate limited\n"
+        return output
     else:
         return f"Unknown Slack resource type: {resource_type}"
 
 def main():
-    """Run the MCP server."""
+    """Run the MCP server over stdio, or over HTTP for many concurrent clients."""
+    parser = argparse.ArgumentParser(description="Slack MCP server")
+    parser.add_argument("--transport", choices=["stdio", "http", "sse"], default=os.getenv('MCP_TRANSPORT', 'stdio'),
+                        help="stdio serves a single client; http (streamable HTTP) and sse serve many")
+    parser.add_argument("--host", default=os.getenv('MCP_HOST', '127.0.0.1'))
+    parser.add_argument("--port", type=int, default=int(os.getenv('MCP_PORT', '8000')))
+    args = parser.parse_args()
+    
     print("Starting Simple MCP Server with Slack integration...")
     print(f"Server name: {mcp.name}")
     print("Available tools:")
@@ -421,11 +597,27 @@ def main():
     else:
         print("⚠️  Slack integration disabled - set SLACK_BOT_TOKEN environment variable")
     
-    print("\nServer is running. Connect using MCP client.")
+    # Load AI models in the background so startup stays fast; AI_WARMUP=0 defers them to first use
+    if os.getenv('AI_WARMUP', '1') != '0':
+        search_engine.start_warmup()
+    
+    # Load the user directory in the background; until it is in, user lookups go through users.info
+    client = get_slack_client()
+    if client:
+        user_directory.start_refresh(client)
+    
+    # Keep joined channels synced and indexed in the background; SLACK_SYNC_WORKER=0 syncs on the request path only
+    if client and os.getenv('SLACK_SYNC_WORKER', '1') != '0':
+        sync_worker.start(client)
     
     try:
-        # Run the server
-        mcp.run()
+        # Run the server; every session shares this process's clients, caches and stores
+        if args.transport == "stdio":
+            print("\nServer is running. Connect using MCP client.")
+            mcp.run()
+        else:
+            print(f"\nServer is running at http://{args.host}:{args.port} ({args.transport}). Connect using MCP clients.")
+            mcp.run(transport=args.transport, host=args.host, port=args.port)
     except Exception as e:
         print(f"Server error: {e}")
         import traceback
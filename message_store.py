@@ -0,0 +1,550 @@
+"""
+Local persistent store for Slack channel history.
+Messages are kept in SQLite and each channel is synced incrementally with
+conversations.history(oldest=last_seen_ts), so searches read locally and only
+fetch the delta from Slack. Thread replies are fetched with
+conversations.replies whenever a parent's latest_reply moves and stored next
+to top-level messages. An inverted index (token -> channel/ts postings) is
+maintained alongside the messages for keyword search.
+"""
+
+import asyncio
+import contextvars
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+from slack_sdk.errors import SlackApiError
+
+# conversations.replies errors that retrying cannot fix, e.g. a deleted parent message
+PERMANENT_THREAD_ERRORS = {'thread_not_found', 'message_not_found', 'channel_not_found', 'not_in_channel', 'is_archived'}
+
+
+def tokenize(text: str) -> Set[str]:
+    """Split text into the lowercase word tokens used by the inverted index."""
+    return set(re.findall(r'\w+', text.lower()))
+
+
+class MessageStore:
+    """SQLite-backed message store with incremental per-channel sync."""
+
+    def __init__(self, path: str, sync_interval: float = 30.0, page_size: int = 200, backfill_limit: int = 1000,
+                 thread_concurrency: int = 4, threads_per_sync: int = 50, thread_window: float = 7 * 86400.0,
+                 thread_rescan_interval: float = 300.0):
+        self.path = path
+        self.sync_interval = sync_interval
+        self.page_size = page_size
+        self.backfill_limit = backfill_limit
+        self.thread_concurrency = thread_concurrency
+        self.threads_per_sync = threads_per_sync
+        # Parents older than the watermark never come back in the incremental fetch, so the
+        # last thread_window seconds of history are re-read every thread_rescan_interval
+        self.thread_window = thread_window
+        self.thread_rescan_interval = thread_rescan_interval
+        self._last_rescan: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._last_sync: Dict[str, float] = {}
+        self.stats = {'syncs': 0, 'skipped_syncs': 0, 'api_calls': 0, 'messages_added': 0,
+                      'thread_fetches': 0, 'replies_added': 0, 'abandoned_threads': 0}
+
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS messages (
+                channel_id TEXT NOT NULL,
+                ts TEXT NOT NULL,
+                ts_num REAL NOT NULL,
+                user_id TEXT,
+                text TEXT,
+                data TEXT NOT NULL,
+                PRIMARY KEY (channel_id, ts)
+            );
+            CREATE INDEX IF NOT EXISTS idx_messages_channel_ts ON messages (channel_id, ts_num DESC);
+            CREATE TABLE IF NOT EXISTS channel_sync (
+                channel_id TEXT PRIMARY KEY,
+                last_seen_ts TEXT NOT NULL,
+                synced_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS threads (
+                channel_id TEXT NOT NULL,
+                thread_ts TEXT NOT NULL,
+                latest_reply TEXT NOT NULL,
+                fetched_reply TEXT,
+                PRIMARY KEY (channel_id, thread_ts)
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                token TEXT NOT NULL,
+                ts_num REAL NOT NULL,
+                channel_id TEXT NOT NULL,
+                ts TEXT NOT NULL,
+                PRIMARY KEY (token, ts_num, channel_id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS vocabulary (
+                token TEXT PRIMARY KEY
+            ) WITHOUT ROWID;
+        """)
+        self._conn.commit()
+        self._ensure_index()
+
+    def _ensure_index(self):
+        """Build postings and the vocabulary for stores created before they existed."""
+        with self._lock:
+            has_postings = self._conn.execute("SELECT 1 FROM postings LIMIT 1").fetchone()
+            if has_postings:
+                if not self._conn.execute("SELECT 1 FROM vocabulary LIMIT 1").fetchone():
+                    self._conn.execute("INSERT OR IGNORE INTO vocabulary (token) SELECT DISTINCT token FROM postings")
+                    self._conn.commit()
+                return
+            rows = self._conn.execute("SELECT channel_id, ts, ts_num, text FROM messages").fetchall()
+            self._index_rows(rows)
+            self._conn.commit()
+
+    def _index_rows(self, rows):
+        """Insert postings and vocabulary for (channel_id, ts, ts_num, text) rows. Caller holds the lock."""
+        postings = [
+            (token, ts_num, channel_id, ts)
+            for channel_id, ts, ts_num, text in rows
+            for token in tokenize(text or '')
+        ]
+        self._conn.executemany("INSERT OR IGNORE INTO postings (token, ts_num, channel_id, ts) VALUES (?, ?, ?, ?)", postings)
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO vocabulary (token) VALUES (?)", [(token,) for token in {row[0] for row in postings}]
+        )
+
+    def last_seen_ts(self, channel_id: str) -> Optional[str]:
+        """Return the newest message timestamp stored for a channel."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_seen_ts FROM channel_sync WHERE channel_id = ?", (channel_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def least_recently_synced(self, channel_ids: List[str]) -> List[str]:
+        """Order channel_ids by their last history sync, channels never synced first."""
+        if not channel_ids:
+            return []
+        with self._lock:
+            synced_at = dict(self._conn.execute(
+                f"SELECT channel_id, synced_at FROM channel_sync WHERE channel_id IN ({','.join('?' * len(channel_ids))})",
+                list(channel_ids),
+            ).fetchall())
+        return sorted(channel_ids, key=lambda channel_id: synced_at.get(channel_id, 0.0))
+
+    def needs_sync(self, channel_id: str, force: bool = False) -> bool:
+        """Return True when the channel has not been synced within sync_interval."""
+        if force:
+            return True
+        last_sync = self._last_sync.get(channel_id)
+        if last_sync is not None and time.monotonic() - last_sync < self.sync_interval:
+            self.stats['skipped_syncs'] += 1
+            return False
+        return True
+
+    def _history_kwargs(self, channel_id: str, oldest: Optional[str], cursor: Optional[str]) -> Dict[str, Any]:
+        kwargs = {'channel': channel_id, 'limit': self.page_size}
+        if oldest:
+            kwargs['oldest'] = oldest
+        if cursor:
+            kwargs['cursor'] = cursor
+        return kwargs
+
+    def _next_cursor(self, result, oldest: Optional[str], fetched: int) -> Optional[str]:
+        cursor = (result.get('response_metadata') or {}).get('next_cursor')
+        # The first sync of a channel only backfills a bounded window of history
+        if not oldest and fetched >= self.backfill_limit:
+            return None
+        return cursor or None
+
+    def _rescan_oldest(self, channel_id: str, oldest: Optional[str]) -> Optional[str]:
+        """Return the start of the thread rescan window when a rescan is due, else None."""
+        now = time.monotonic()
+        last = self._last_rescan.get(channel_id)
+        if last is not None and now - last < self.thread_rescan_interval:
+            return None
+        self._last_rescan[channel_id] = now
+        # A first sync's backfill already covers the newest parents
+        if not oldest:
+            return None
+        return f"{time.time() - self.thread_window:.6f}"
+
+    def _rescan_next_cursor(self, result, fetched: int) -> Optional[str]:
+        cursor = (result.get('response_metadata') or {}).get('next_cursor')
+        if fetched >= self.backfill_limit:
+            return None
+        return cursor or None
+
+    def sync_channel(self, client, channel_id: str, force: bool = False, thread_limit: Optional[int] = None) -> int:
+        """
+        Fetch messages newer than the last seen timestamp and up to thread_limit
+        (default threads_per_sync) changed threads. Returns the number of new messages.
+        """
+        if not self.needs_sync(channel_id, force):
+            return 0
+
+        oldest = self.last_seen_ts(channel_id)
+        messages = []
+        cursor = None
+        while True:
+            result = client.conversations_history(**self._history_kwargs(channel_id, oldest, cursor))
+            self.stats['api_calls'] += 1
+            messages.extend(result.get('messages', []))
+            cursor = self._next_cursor(result, oldest, len(messages))
+            if not cursor:
+                break
+
+        added = self.add_messages(channel_id, messages)
+        self.record_threads(channel_id, messages)
+
+        window_start = self._rescan_oldest(channel_id, oldest)
+        if window_start:
+            parents = []
+            cursor = None
+            while True:
+                result = client.conversations_history(**self._history_kwargs(channel_id, window_start, cursor))
+                self.stats['api_calls'] += 1
+                parents.extend(result.get('messages', []))
+                cursor = self._rescan_next_cursor(result, len(parents))
+                if not cursor:
+                    break
+            self.record_threads(channel_id, parents)
+        return added + self.sync_threads(client, channel_id, thread_limit)
+
+    async def async_sync_channel(self, client, channel_id: str, force: bool = False,
+                                 thread_limit: Optional[int] = None, run_blocking=asyncio.to_thread) -> int:
+        """
+        Async variant of sync_channel() for use with AsyncWebClient.
+        SQLite work goes through run_blocking so it never holds up the event loop.
+        """
+        if not self.needs_sync(channel_id, force):
+            return 0
+
+        oldest = await run_blocking(self.last_seen_ts, channel_id)
+        messages = []
+        cursor = None
+        while True:
+            result = await client.conversations_history(**self._history_kwargs(channel_id, oldest, cursor))
+            self.stats['api_calls'] += 1
+            messages.extend(result.get('messages', []))
+            cursor = self._next_cursor(result, oldest, len(messages))
+            if not cursor:
+                break
+
+        added = await run_blocking(self.add_messages, channel_id, messages)
+        await run_blocking(self.record_threads, channel_id, messages)
+
+        window_start = self._rescan_oldest(channel_id, oldest)
+        if window_start:
+            parents = []
+            cursor = None
+            while True:
+                result = await client.conversations_history(**self._history_kwargs(channel_id, window_start, cursor))
+                self.stats['api_calls'] += 1
+                parents.extend(result.get('messages', []))
+                cursor = self._rescan_next_cursor(result, len(parents))
+                if not cursor:
+                    break
+            await run_blocking(self.record_threads, channel_id, parents)
+        return added + await self.async_sync_threads(client, channel_id, thread_limit, run_blocking)
+
+    def record_threads(self, channel_id: str, messages: List[Dict[str, Any]]):
+        """Remember the latest_reply of every thread parent in messages so changed threads get refetched."""
+        rows = [
+            (channel_id, msg['ts'], msg['latest_reply'])
+            for msg in messages
+            if msg.get('latest_reply') and msg.get('thread_ts') == msg.get('ts')
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO threads (channel_id, thread_ts, latest_reply) VALUES (?, ?, ?) "
+                "ON CONFLICT (channel_id, thread_ts) DO UPDATE SET latest_reply = excluded.latest_reply",
+                rows,
+            )
+            self._conn.commit()
+
+    def pending_threads(self, channel_id: str, limit: Optional[int] = None) -> List[Tuple[str, str, Optional[str]]]:
+        """Return (thread_ts, latest_reply, fetched_reply) for threads with replies not stored yet, most active first."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT thread_ts, latest_reply, fetched_reply FROM threads "
+                "WHERE channel_id = ? AND (fetched_reply IS NULL OR fetched_reply != latest_reply) "
+                "ORDER BY CAST(latest_reply AS REAL) DESC LIMIT ?",
+                (channel_id, limit if limit is not None else -1),
+            ).fetchall()
+
+    def _replies_kwargs(self, channel_id: str, thread_ts: str, oldest: Optional[str], cursor: Optional[str]) -> Dict[str, Any]:
+        kwargs = {'channel': channel_id, 'ts': thread_ts, 'limit': self.page_size}
+        if oldest:
+            kwargs['oldest'] = oldest
+        if cursor:
+            kwargs['cursor'] = cursor
+        return kwargs
+
+    def _fetch_replies(self, client, channel_id: str, thread: Tuple[str, str, Optional[str]]) -> int:
+        thread_ts, latest_reply, fetched_reply = thread
+        replies = []
+        cursor = None
+        try:
+            while True:
+                # Only replies after the last one already stored are requested
+                result = client.conversations_replies(**self._replies_kwargs(channel_id, thread_ts, fetched_reply, cursor))
+                self.stats['api_calls'] += 1
+                replies.extend(result.get('messages', []))
+                cursor = (result.get('response_metadata') or {}).get('next_cursor')
+                if not cursor:
+                    break
+        except SlackApiError as e:
+            if e.response.get('error') not in PERMANENT_THREAD_ERRORS:
+                raise
+            return self.abandon_thread(channel_id, thread_ts, latest_reply)
+        return self.add_replies(channel_id, thread_ts, latest_reply, replies)
+
+    async def _async_fetch_replies(self, client, channel_id: str, thread: Tuple[str, str, Optional[str]],
+                                   run_blocking=asyncio.to_thread) -> int:
+        thread_ts, latest_reply, fetched_reply = thread
+        replies = []
+        cursor = None
+        try:
+            while True:
+                result = await client.conversations_replies(**self._replies_kwargs(channel_id, thread_ts, fetched_reply, cursor))
+                self.stats['api_calls'] += 1
+                replies.extend(result.get('messages', []))
+                cursor = (result.get('response_metadata') or {}).get('next_cursor')
+                if not cursor:
+                    break
+        except SlackApiError as e:
+            if e.response.get('error') not in PERMANENT_THREAD_ERRORS:
+                raise
+            return await run_blocking(self.abandon_thread, channel_id, thread_ts, latest_reply)
+        return await run_blocking(self.add_replies, channel_id, thread_ts, latest_reply, replies)
+
+    def sync_threads(self, client, channel_id: str, limit: Optional[int] = None) -> int:
+        """
+        Fetch replies for threads whose latest_reply changed, a few at a time.
+        At most threads_per_sync threads are fetched per call; the rest stay
+        pending for the next sync. Returns the number of new replies.
+        """
+        threads = self.pending_threads(channel_id, limit if limit is not None else self.threads_per_sync)
+        if not threads:
+            return 0
+        # Run fetches in the caller's context so the scheduler sees the caller's priority lane
+        context = contextvars.copy_context()
+        with ThreadPoolExecutor(max_workers=self.thread_concurrency) as executor:
+            futures = [
+                executor.submit(context.copy().run, self._fetch_replies, client, channel_id, thread)
+                for thread in threads
+            ]
+            added = 0
+            for future in futures:
+                try:
+                    added += future.result()
+                except Exception:
+                    # Transient failures stay pending for a later sync; permanent ones were abandoned
+                    continue
+            return added
+
+    async def async_sync_threads(self, client, channel_id: str, limit: Optional[int] = None,
+                                 run_blocking=asyncio.to_thread) -> int:
+        """Async variant of sync_threads() for use with AsyncWebClient; SQLite work goes through run_blocking."""
+        threads = await run_blocking(
+            self.pending_threads, channel_id, limit if limit is not None else self.threads_per_sync
+        )
+        if not threads:
+            return 0
+        semaphore = asyncio.Semaphore(self.thread_concurrency)
+
+        async def fetch(thread):
+            async with semaphore:
+                return await self._async_fetch_replies(client, channel_id, thread, run_blocking)
+
+        results = await asyncio.gather(*(fetch(thread) for thread in threads), return_exceptions=True)
+        return sum(result for result in results if not isinstance(result, BaseException))
+
+    def add_replies(self, channel_id: str, thread_ts: str, latest_reply: str, replies: List[Dict[str, Any]]) -> int:
+        """Store and index thread replies, then mark the thread as fetched up to latest_reply."""
+        added = self.add_messages(channel_id, replies, advance_watermark=False)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE threads SET fetched_reply = ? WHERE channel_id = ? AND thread_ts = ?",
+                (latest_reply, channel_id, thread_ts),
+            )
+            self._conn.commit()
+        self.stats['thread_fetches'] += 1
+        self.stats['replies_added'] += added
+        return added
+
+    def abandon_thread(self, channel_id: str, thread_ts: str, latest_reply: str) -> int:
+        """Mark a thread that can no longer be fetched as done up to latest_reply so it stops taking sync slots."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE threads SET fetched_reply = ? WHERE channel_id = ? AND thread_ts = ?",
+                (latest_reply, channel_id, thread_ts),
+            )
+            self._conn.commit()
+        self.stats['abandoned_threads'] += 1
+        return 0
+
+    def add_messages(self, channel_id: str, messages: List[Dict[str, Any]], advance_watermark: bool = True) -> int:
+        """
+        Insert new messages for a channel and index them.
+        History syncs also advance the channel's watermark; thread replies must not,
+        since a reply newer than the last history page would hide unseen messages.
+        """
+        # Slack treats 'oldest' as inclusive, so the watermark message comes back on every sync
+        rows = [
+            (channel_id, msg['ts'], float(msg['ts']), msg.get('user'), msg.get('text', ''), json.dumps(msg))
+            for msg in messages if msg.get('ts')
+        ]
+
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO messages (channel_id, ts, ts_num, user_id, text, data) VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            added = self._conn.total_changes - before
+            self._index_rows([(row[0], row[1], row[2], row[4]) for row in rows])
+            if advance_watermark:
+                row = self._conn.execute(
+                    "SELECT last_seen_ts FROM channel_sync WHERE channel_id = ?", (channel_id,)
+                ).fetchone()
+                newest = max([r[1] for r in rows] + ([row[0]] if row else []), key=float, default=None)
+                if newest:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO channel_sync (channel_id, last_seen_ts, synced_at) VALUES (?, ?, ?)",
+                        (channel_id, newest, time.time()),
+                    )
+            self._conn.commit()
+
+        if advance_watermark:
+            self._last_sync[channel_id] = time.monotonic()
+            self.stats['syncs'] += 1
+        self.stats['messages_added'] += added
+        return added
+
+    def get_messages(self, channel_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Return stored messages for a channel, newest first."""
+        sql = "SELECT data FROM messages WHERE channel_id = ? ORDER BY ts_num DESC"
+        params: List[Any] = [channel_id]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def get_many(self, keys: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """Return the stored messages for (channel_id, ts) pairs, tagged with their channel; unknown pairs are skipped."""
+        messages = []
+        with self._lock:
+            for channel_id, ts in keys:
+                row = self._conn.execute(
+                    "SELECT data FROM messages WHERE channel_id = ? AND ts = ?", (channel_id, ts)
+                ).fetchone()
+                if row:
+                    msg = json.loads(row[0])
+                    msg['channel_id'] = channel_id
+                    messages.append(msg)
+        return messages
+
+    def search(self, query: str, channel_ids: Optional[List[str]] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Find stored messages containing the query as a substring, newest first.
+        Interior query tokens must appear as whole words in any match, so the longest
+        one drives the scan. With several tokens the last can only be a word prefix
+        and its prefix range is scanned; a lone token can sit anywhere in a word
+        ("deploy" in "redeploy"), so the postings of every vocabulary word containing
+        it are scanned. Lone tokens under three characters match too many words for
+        that to pay off and scan messages by recency instead. Results are read in
+        timestamp order, so the scan stops as soon as enough matches are found.
+        """
+        query_lower = query.lower()
+        tokens = re.findall(r'\w+', query_lower)
+        channel_filter = ""
+        channel_params: List[Any] = []
+        if channel_ids is not None:
+            if not channel_ids:
+                return []
+            channel_filter = f" AND {{alias}}.channel_id IN ({','.join('?' * len(channel_ids))})"
+            channel_params = list(channel_ids)
+
+        matches = []
+        with self._lock:
+            interior = tokens[1:-1]
+            if interior:
+                # Longer words are usually rarer; ties go to the earlier token so the choice is stable
+                driver = max(interior, key=len)
+                cursor = self._conn.execute(
+                    "SELECT m.channel_id, m.ts, m.text, m.data FROM postings p "
+                    "JOIN messages m ON m.channel_id = p.channel_id AND m.ts = p.ts "
+                    "WHERE p.token = ?" + channel_filter.format(alias='p') + " ORDER BY p.ts_num DESC",
+                    [driver] + channel_params,
+                )
+            elif len(tokens) == 1 and len(tokens[0]) >= 3:
+                # A lone token may start and end mid-word: scan every word containing it
+                cursor = self._conn.execute(
+                    "SELECT m.channel_id, m.ts, m.text, m.data FROM postings p "
+                    "JOIN messages m ON m.channel_id = p.channel_id AND m.ts = p.ts "
+                    "WHERE p.token IN (SELECT token FROM vocabulary WHERE instr(token, ?) > 0)"
+                    + channel_filter.format(alias='p') + " ORDER BY p.ts_num DESC",
+                    [tokens[0]] + channel_params,
+                )
+            elif len(tokens) > 1:
+                # The last token may end mid-word ("prod" in "production"): scan every token with that prefix
+                prefix = tokens[-1]
+                upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+                cursor = self._conn.execute(
+                    "SELECT m.channel_id, m.ts, m.text, m.data FROM postings p "
+                    "JOIN messages m ON m.channel_id = p.channel_id AND m.ts = p.ts "
+                    "WHERE p.token >= ? AND p.token < ?" + channel_filter.format(alias='p') + " ORDER BY p.ts_num DESC",
+                    [prefix, upper] + channel_params,
+                )
+            else:
+                # Punctuation-only and very short queries fall back to a recency-ordered scan
+                cursor = self._conn.execute(
+                    "SELECT m.channel_id, m.ts, m.text, m.data FROM messages m WHERE 1 = 1"
+                    + channel_filter.format(alias='m') + " ORDER BY m.ts_num DESC",
+                    channel_params,
+                )
+
+            seen = set()
+            for channel_id, ts, text, data in cursor:
+                # Prefix and infix scans can reach the same message through several of its words
+                if query_lower not in (text or '').lower() or (channel_id, ts) in seen:
+                    continue
+                seen.add((channel_id, ts))
+                msg = json.loads(data)
+                msg['channel_id'] = channel_id
+                matches.append(msg)
+                if len(matches) >= limit:
+                    break
+        return matches
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return sync counters and store size."""
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+            channels = self._conn.execute("SELECT COUNT(*) FROM channel_sync").fetchone()[0]
+            pending = self._conn.execute(
+                "SELECT COUNT(*) FROM threads WHERE fetched_reply IS NULL OR fetched_reply != latest_reply"
+            ).fetchone()[0]
+        return dict(self.stats, messages=count, channels=channels, pending_threads=pending)
+
+
+# Global message store shared by all tools
+message_store = MessageStore(
+    os.getenv('SLACK_MESSAGE_STORE', os.path.expanduser('~/.slack-mcp-server/messages.db')),
+    sync_interval=float(os.getenv('SLACK_SYNC_INTERVAL', '30')),
+    thread_concurrency=int(os.getenv('SLACK_THREAD_CONCURRENCY', '4')),
+    threads_per_sync=int(os.getenv('SLACK_THREADS_PER_SYNC', '50')),
+    thread_window=float(os.getenv('SLACK_THREAD_WINDOW_DAYS', '7')) * 86400,
+    thread_rescan_interval=float(os.getenv('SLACK_THREAD_RESCAN_INTERVAL', '300')),
+)
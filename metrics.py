@@ -0,0 +1,210 @@
+"""
+In-process instrumentation for the server's hot paths.
+Prometheus-style counters and histograms kept in a single registry; the
+histograms double as timers (context managers or decorators) around each
+stage, and the registry renders the Prometheus text exposition format.
+"""
+
+import asyncio
+import functools
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+# Prometheus default latency buckets, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    type_name = 'counter'
+
+    def __init__(self, name: str, help: str, lock: threading.Lock):
+        self.name = name
+        self.help = help
+        self._lock = lock
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        return [f'{self.name}{_format_labels(key)} {value:g}' for key, value in sorted(self._values.items())]
+
+
+class _Timer:
+    """Observes elapsed seconds into a histogram; usable as a context manager or a decorator."""
+
+    def __init__(self, histogram: 'Histogram', labels: Dict[str, Any]):
+        self.histogram = histogram
+        self.labels = labels
+        self._started: List[float] = []
+
+    def __enter__(self):
+        self._started.append(time.perf_counter())
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self._started.pop(), **self.labels)
+        return False
+
+    def __call__(self, fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    self.histogram.observe(time.perf_counter() - started, **self.labels)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.histogram.observe(time.perf_counter() - started, **self.labels)
+        return wrapper
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels."""
+
+    type_name = 'histogram'
+
+    def __init__(self, name: str, help: str, lock: threading.Lock, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self._lock = lock
+        # Per label set: [count per bucket (+Inf last), sum, count, max]
+        self._series: Dict[LabelKey, List[Any]] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0, value]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            else:
+                series[0][-1] += 1
+            series[1] += value
+            series[2] += 1
+            series[3] = max(series[3], value)
+
+    def time(self, **labels) -> _Timer:
+        """Time a block (with ...) or every call of a function (@...)."""
+        return _Timer(self, labels)
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """
+        Estimate a quantile by linear interpolation within buckets, as histogram_quantile()
+        does, capped at the largest observed value so fast stages aren't reported at bucket width.
+        """
+        with self._lock:
+            series = self._series.get(_label_key(labels))
+            if series is None or series[2] == 0:
+                return None
+            counts, total, largest = list(series[0]), series[2], series[3]
+        rank = q * total
+        cumulative, lower = 0, 0.0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            if count and cumulative + count >= rank:
+                if bound == float('inf'):
+                    return largest
+                return min(largest, lower + (bound - lower) * (rank - cumulative) / count)
+            cumulative += count
+            lower = bound
+        return largest
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total, count, _) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else f'{bound:g}'
+                lines.append(f'{self.name}_bucket{_format_labels(key, ("le", le))} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(key)} {total:g}')
+            lines.append(f'{self.name}_count{_format_labels(key)} {count}')
+        return lines
+
+    def series(self) -> Dict[LabelKey, Tuple[int, float]]:
+        """Return (count, sum) for every label set."""
+        with self._lock:
+            return {key: (series[2], series[1]) for key, series in self._series.items()}
+
+
+class MetricsRegistry:
+    """Registry of named metrics that renders the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Any] = {}
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, help, self._lock))
+
+    def histogram(self, name: str, help: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, help, self._lock, buckets))
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, metric in sorted(self._metrics.items()):
+                lines.append(f'# HELP {name} {metric.help}')
+                lines.append(f'# TYPE {name} {metric.type_name}')
+                lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+    def breakdown(self) -> str:
+        """Summarize every histogram series as count, mean and estimated p50/p95 in milliseconds."""
+        lines = []
+        histograms = [metric for _, metric in sorted(self._metrics.items()) if isinstance(metric, Histogram)]
+        for histogram in histograms:
+            for key, (count, total) in sorted(histogram.series().items()):
+                if not count:
+                    continue
+                labels = dict(key)
+                p50 = histogram.quantile(0.5, **labels) * 1000
+                p95 = histogram.quantile(0.95, **labels) * 1000
+                lines.append(f"{histogram.name}{_format_labels(key)}: {count} calls, "
+                             f"mean {total / count * 1000:.2f} ms, p50 {p50:.2f} ms, p95 {p95:.2f} ms")
+        return '\n'.join(lines)
+
+
+# Global registry and the metrics recorded by the server
+registry = MetricsRegistry()
+
+TOOL_SECONDS = registry.histogram('mcp_tool_duration_seconds', 'MCP tool and resource latency')
+STAGE_SECONDS = registry.histogram('search_stage_duration_seconds', 'Latency of each smart search stage')
+SLACK_REQUEST_SECONDS = registry.histogram('slack_api_request_duration_seconds', 'Slack Web API call latency, including retries')
+SLACK_REQUESTS = registry.counter('slack_api_requests_total', 'Slack Web API calls by method and outcome')
+SLACK_WAIT_SECONDS = registry.histogram('slack_scheduler_wait_seconds', 'Time Slack calls waited for a rate limit token')
+OPENAI_REQUEST_SECONDS = registry.histogram('openai_request_duration_seconds', 'OpenAI API call latency')
+OPENAI_REQUESTS = registry.counter('openai_requests_total', 'OpenAI API calls by operation and outcome')
+ENCODED_TEXTS = registry.counter('embedding_texts_encoded_total', 'Texts encoded by the embedding model')
@@ -0,0 +1,301 @@
+"""
+In-memory caches for Slack workspace metadata.
+Keeps user profiles and channel metadata shared across tools so that
+rendering messages does not cost one Slack API round-trip per message.
+"""
+
+import bisect
+import difflib
+import os
+import sys
+import threading
+import time
+from typing import Dict, Any, List, Optional, Set
+
+from slack_sdk.errors import SlackApiError
+
+from slack_pagination import PAGE_SIZES, iter_pages
+from slack_scheduler import BACKGROUND, lane
+
+
+def _user_names(user: Dict[str, Any]) -> Set[str]:
+    """Casefolded handle, real name and display names of a user."""
+    profile = user.get('profile') or {}
+    names = [
+        user.get('name'), user.get('real_name'),
+        profile.get('real_name'), profile.get('real_name_normalized'),
+        profile.get('display_name'), profile.get('display_name_normalized'),
+    ]
+    return {name.casefold().strip() for name in names if name and name.strip()}
+
+
+class UserDirectory:
+    """Workspace-wide user cache, bulk-loaded from users.list and refreshed on a TTL."""
+
+    def __init__(self, ttl: float = 3600.0, page_size: int = PAGE_SIZES['users.list'], load_wait: float = 2.0):
+        self.ttl = ttl
+        self.page_size = page_size
+        # Longest a name lookup waits for the first bulk load, which takes minutes on large workspaces
+        self.load_wait = load_wait
+        self._users: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        # Set once the first bulk load has finished (or failed)
+        self._loaded = threading.Event()
+        self._inflight: Dict[str, threading.Event] = {}
+        # Name index: full names and individual name words -> user IDs, plus sorted names for prefix lookups
+        self._names: Dict[str, Set[str]] = {}
+        self._name_words: Dict[str, Set[str]] = {}
+        self._sorted_names: List[str] = []
+        self.stats = {'hits': 0, 'misses': 0, 'refreshes': 0, 'api_calls': 0, 'unloaded_name_lookups': 0}
+
+    def is_stale(self) -> bool:
+        """Return True when the bulk-loaded directory has expired."""
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl
+
+    def refresh(self, client) -> int:
+        """Reload every user from paginated users.list. Returns the number of users loaded."""
+        users: Dict[str, Optional[Dict[str, Any]]] = {}
+        for page in iter_pages(client.users_list, self.page_size):
+            self.stats['api_calls'] += 1
+            for user in page.get('members', []):
+                users[user['id']] = user
+
+        names: Dict[str, Set[str]] = {}
+        name_words: Dict[str, Set[str]] = {}
+        for user_id, user in users.items():
+            if user.get('deleted'):
+                continue
+            for name in _user_names(user):
+                names.setdefault(name, set()).add(user_id)
+                for word in name.split():
+                    name_words.setdefault(word, set()).add(user_id)
+
+        with self._lock:
+            self._users = users
+            self._names = names
+            self._name_words = name_words
+            self._sorted_names = sorted(names)
+            self._loaded_at = time.monotonic()
+            self.stats['refreshes'] += 1
+        return len(users)
+
+    def _start_background_refresh(self, client):
+        """Reload the directory in a daemon thread unless a reload is already running."""
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                with lane(BACKGROUND):
+                    self.refresh(client)
+            except Exception as e:
+                # Keep serving whatever we had; retry after another TTL period
+                print(f"Warning: user directory refresh failed: {e}", file=sys.stderr)
+                self._loaded_at = time.monotonic()
+            finally:
+                self._loaded.set()
+                self._refresh_lock.release()
+
+        threading.Thread(target=run, name='user-directory-refresh', daemon=True).start()
+
+    def start_refresh(self, client):
+        """Bulk-load the directory in the background if it has expired, e.g. at startup."""
+        if self.is_stale():
+            self._start_background_refresh(client)
+
+    def _ensure_fresh(self, client):
+        """
+        Start a background reload if the directory has expired. Loads never block
+        lookups by ID: misses are served by users.info until the directory is in.
+        """
+        self.start_refresh(client)
+
+    def get(self, client, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get a user's profile, falling back to users.info for IDs missing from the directory."""
+        if not user_id:
+            return None
+
+        self._ensure_fresh(client)
+
+        with self._lock:
+            if user_id in self._users:
+                self.stats['hits'] += 1
+                return self._users[user_id]
+            self.stats['misses'] += 1
+            event = self._inflight.get(user_id)
+            leader = event is None
+            if leader:
+                event = threading.Event()
+                self._inflight[user_id] = event
+
+        if not leader:
+            # Another caller is already fetching this user
+            event.wait()
+            with self._lock:
+                return self._users.get(user_id)
+
+        resolved = False
+        user = None
+        try:
+            self.stats['api_calls'] += 1
+            user = client.users_info(user=user_id)['user']
+            resolved = True
+            return user
+        except SlackApiError as e:
+            if e.response['error'] != 'user_not_found':
+                raise
+            # Unknown IDs are cached as None until the next refresh
+            resolved = True
+            return None
+        finally:
+            with self._lock:
+                if resolved:
+                    self._users[user_id] = user
+                del self._inflight[user_id]
+            event.set()
+
+    def resolve_name(self, client, name: str, max_matches: int = 20) -> Set[str]:
+        """
+        Resolve a person's name or handle to user IDs.
+        Tries an exact name, then a single name word ("john"), then name prefixes,
+        then close fuzzy matches; all comparisons are casefolded. Returns an empty
+        set if the first bulk load is not in within load_wait seconds, leaving
+        callers to match the name in message text.
+        """
+        key = name.lstrip('@').casefold().strip()
+        if not key:
+            return set()
+
+        self._ensure_fresh(client)
+        # Names can only be resolved against the directory, so give the first bulk load a moment
+        if not self._loaded.wait(self.load_wait):
+            self.stats['unloaded_name_lookups'] += 1
+            return set()
+
+        with self._lock:
+            if key in self._names:
+                return set(self._names[key])
+            if key in self._name_words:
+                return set(self._name_words[key])
+
+            matches: Set[str] = set()
+            position = bisect.bisect_left(self._sorted_names, key)
+            while (position < len(self._sorted_names) and len(matches) < max_matches
+                   and self._sorted_names[position].startswith(key)):
+                matches |= self._names[self._sorted_names[position]]
+                position += 1
+            if matches:
+                return matches
+
+            for close in difflib.get_close_matches(key, self._sorted_names, n=3, cutoff=0.85):
+                matches |= self._names[close]
+            return matches
+
+    def display_name(self, client, user_id: str) -> str:
+        """Resolve a user ID to the name shown in tool output."""
+        try:
+            user = self.get(client, user_id)
+        except Exception:
+            user = None
+        if not user:
+            return user_id
+        return user.get('real_name') or user.get('name') or user_id
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return cache counters and size."""
+        with self._lock:
+            return dict(self.stats, size=len(self._users))
+
+
+class ChannelDirectory:
+    """Channel metadata cache keyed by channel ID, seeded from conversations.list results."""
+
+    def __init__(self, ttl: float = 3600.0):
+        self.ttl = ttl
+        self._channels: Dict[str, Dict[str, Any]] = {}
+        self._fetched_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'seeded': 0, 'invalidations': 0, 'api_calls': 0}
+
+    def seed(self, channels: List[Dict[str, Any]]):
+        """Store channel objects already returned by conversations.list."""
+        now = time.monotonic()
+        with self._lock:
+            for channel in channels:
+                self._channels[channel['id']] = channel
+                self._fetched_at[channel['id']] = now
+            self.stats['seeded'] += len(channels)
+
+    def _lookup(self, channel_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            fetched_at = self._fetched_at.get(channel_id)
+            if fetched_at is not None and time.monotonic() - fetched_at <= self.ttl:
+                self.stats['hits'] += 1
+                return self._channels[channel_id]
+            self.stats['misses'] += 1
+            return None
+
+    def get(self, client, channel_id: str) -> Dict[str, Any]:
+        """Get channel metadata, calling conversations.info only on a miss or expired entry."""
+        channel = self._lookup(channel_id)
+        if channel is not None:
+            return channel
+
+        self.stats['api_calls'] += 1
+        channel = client.conversations_info(channel=channel_id)['channel']
+        self.seed([channel])
+        return channel
+
+    def name(self, client, channel_id: str) -> str:
+        """Resolve a channel ID to its name."""
+        return self.get(client, channel_id)['name']
+
+    def find_by_names(self, names: List[str]) -> List[str]:
+        """Return IDs of cached channels whose names match, ignoring case and a leading '#'."""
+        wanted = {name.lstrip('#').casefold() for name in names if name}
+        with self._lock:
+            return [
+                channel_id for channel_id, channel in self._channels.items()
+                if channel.get('name', '').casefold() in wanted
+            ]
+
+    async def aget(self, client, channel_id: str) -> Dict[str, Any]:
+        """Async variant of get() for use with AsyncWebClient."""
+        channel = self._lookup(channel_id)
+        if channel is not None:
+            return channel
+
+        self.stats['api_calls'] += 1
+        channel = (await client.conversations_info(channel=channel_id))['channel']
+        self.seed([channel])
+        return channel
+
+    async def aname(self, client, channel_id: str) -> str:
+        """Async variant of name() for use with AsyncWebClient."""
+        return (await self.aget(client, channel_id))['name']
+
+    def invalidate(self, channel_id: Optional[str] = None):
+        """Drop one channel, or every channel when no ID is given."""
+        with self._lock:
+            if channel_id is None:
+                self._channels.clear()
+                self._fetched_at.clear()
+            else:
+                self._channels.pop(channel_id, None)
+                self._fetched_at.pop(channel_id, None)
+            self.stats['invalidations'] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return cache counters and size."""
+        with self._lock:
+            return dict(self.stats, size=len(self._channels))
+
+
+# Global caches shared by all tools
+user_directory = UserDirectory(
+    ttl=float(os.getenv('SLACK_USER_CACHE_TTL', '3600')),
+    load_wait=float(os.getenv('SLACK_USER_LOAD_WAIT', '2')),
+)
+channel_directory = ChannelDirectory(ttl=float(os.getenv('SLACK_CHANNEL_CACHE_TTL', '3600')))
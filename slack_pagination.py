@@ -0,0 +1,62 @@
+"""
+Cursor pagination for Slack Web API list methods.
+Pages are streamed to the caller while the request for the next page is
+already in flight, so walking a large workspace costs roughly one round-trip
+per page instead of one round-trip plus processing time.
+"""
+
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterator
+
+# Largest page size Slack accepts (or recommends) for each paginated method
+PAGE_SIZES = {
+    'conversations.list': 1000,
+    'users.list': 200,
+}
+
+
+def _next_cursor(page) -> str:
+    return (page.get('response_metadata') or {}).get('next_cursor') or ''
+
+
+def iter_pages(fetch: Callable[..., Any], page_size: int, **kwargs) -> Iterator[Any]:
+    """Yield every page of a cursor-paginated Slack method, prefetching the next page in a worker thread."""
+    # Run fetches in the caller's context so the scheduler sees the caller's priority lane
+    context = contextvars.copy_context()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(context.run, fetch, limit=page_size, **kwargs)
+        while future is not None:
+            page = future.result()
+            cursor = _next_cursor(page)
+            future = executor.submit(context.run, fetch, limit=page_size, cursor=cursor, **kwargs) if cursor else None
+            yield page
+
+
+async def aiter_pages(fetch: Callable[..., Any], page_size: int, **kwargs) -> AsyncIterator[Any]:
+    """Async variant of iter_pages() for AsyncWebClient methods, prefetching with a task."""
+    task = asyncio.ensure_future(fetch(limit=page_size, **kwargs))
+    try:
+        while task is not None:
+            page = await task
+            cursor = _next_cursor(page)
+            task = asyncio.ensure_future(fetch(limit=page_size, cursor=cursor, **kwargs)) if cursor else None
+            yield page
+    finally:
+        # Stop the prefetch if the caller breaks out early
+        if task is not None:
+            task.cancel()
+
+
+def iter_items(fetch: Callable[..., Any], key: str, page_size: int, **kwargs) -> Iterator[Dict[str, Any]]:
+    """Yield the items under key from every page."""
+    for page in iter_pages(fetch, page_size, **kwargs):
+        yield from page.get(key, [])
+
+
+async def aiter_items(fetch: Callable[..., Any], key: str, page_size: int, **kwargs) -> AsyncIterator[Dict[str, Any]]:
+    """Async variant of iter_items()."""
+    async for page in aiter_pages(fetch, page_size, **kwargs):
+        for item in page.get(key, []):
+            yield item
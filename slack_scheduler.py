@@ -0,0 +1,260 @@
+"""
+Rate-limit-aware scheduling for Slack Web API calls.
+Every request waits for a token from its method's tier bucket, 429 responses
+pause the method for the Retry-After period before retrying, and background
+work yields to interactive tool calls.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import os
+import threading
+import time
+from typing import Dict, Any, Optional
+
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+from slack_sdk.web.async_client import AsyncWebClient
+
+from metrics import SLACK_REQUEST_SECONDS, SLACK_REQUESTS, SLACK_WAIT_SECONDS
+
+# Requests per minute for Slack's documented rate limit tiers
+TIER_RATES = {1: 1, 2: 20, 3: 50, 4: 100}
+
+# Tier of each Web API method used by this server; unknown methods default to tier 3
+METHOD_TIERS = {
+    'conversations.list': 2,
+    'conversations.info': 3,
+    'conversations.history': 3,
+    'conversations.replies': 3,
+    'users.list': 2,
+    'users.info': 4,
+    'chat.postMessage': 4,
+}
+
+INTERACTIVE = 'interactive'
+BACKGROUND = 'background'
+
+_lane: contextvars.ContextVar = contextvars.ContextVar('slack_lane', default=INTERACTIVE)
+_call_counter: contextvars.ContextVar = contextvars.ContextVar('slack_call_counter', default=None)
+
+
+@contextlib.contextmanager
+def lane(name: str):
+    """Run the enclosed Slack calls in the given priority lane."""
+    token = _lane.set(name)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+class CallCounter:
+    """Thread-safe count of Slack API requests sent."""
+
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def add(self):
+        with self._lock:
+            self.calls += 1
+
+
+@contextlib.contextmanager
+def count_calls():
+    """
+    Count the Slack API requests made by the enclosed code, including retries and
+    calls from threads or tasks that run in a copy of its context.
+    """
+    counter = CallCounter()
+    token = _call_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _call_counter.reset(token)
+
+
+def _count_call():
+    counter = _call_counter.get()
+    if counter is not None:
+        counter.add()
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at rate tokens per second."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def time_until_available(self, now: float) -> float:
+        """Refill, then return seconds until one token is available (0 if one is ready)."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RequestScheduler:
+    """Per-method token buckets with Retry-After handling and interactive/background lanes."""
+
+    def __init__(self, max_retries: int = 3, burst_seconds: float = 15.0):
+        self.max_retries = max_retries
+        self.burst_seconds = burst_seconds
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._blocked_until: Dict[str, float] = {}
+        self._waiting = {INTERACTIVE: 0, BACKGROUND: 0}
+        self._cond = threading.Condition()
+        self.stats: Dict[str, Dict[str, float]] = {}
+
+    def _bucket(self, method: str) -> TokenBucket:
+        bucket = self._buckets.get(method)
+        if bucket is None:
+            per_minute = TIER_RATES[METHOD_TIERS.get(method, 3)]
+            bucket = TokenBucket(per_minute / 60.0, max(1.0, per_minute * self.burst_seconds / 60.0))
+            self._buckets[method] = bucket
+        return bucket
+
+    def _method_stats(self, method: str) -> Dict[str, float]:
+        return self.stats.setdefault(method, {'calls': 0, 'waits': 0, 'wait_seconds': 0.0, 'rate_limited': 0})
+
+    def _try_acquire(self, method: str, priority: str) -> float:
+        """Take a token if allowed now; otherwise return how long to wait. Caller holds the lock."""
+        now = time.monotonic()
+        if priority == BACKGROUND and self._waiting[INTERACTIVE]:
+            # Background work yields while interactive calls are queued
+            return 0.05
+        blocked = self._blocked_until.get(method, 0.0) - now
+        if blocked > 0:
+            return blocked
+        bucket = self._bucket(method)
+        wait = bucket.time_until_available(now)
+        if wait <= 0:
+            bucket.tokens -= 1
+            self._method_stats(method)['calls'] += 1
+        return wait
+
+    def acquire(self, method: str):
+        """Block the calling thread until method may be called in the current lane."""
+        priority = _lane.get()
+        started = time.monotonic()
+        with self._cond:
+            wait = self._try_acquire(method, priority)
+            if wait <= 0:
+                return
+            self._waiting[priority] += 1
+            try:
+                while wait > 0:
+                    self._cond.wait(wait)
+                    wait = self._try_acquire(method, priority)
+            finally:
+                self._waiting[priority] -= 1
+                self._record_wait(method, time.monotonic() - started)
+                self._cond.notify_all()
+
+    async def acquire_async(self, method: str):
+        """Wait on the event loop until method may be called in the current lane."""
+        priority = _lane.get()
+        started = time.monotonic()
+        with self._cond:
+            wait = self._try_acquire(method, priority)
+            if wait <= 0:
+                return
+            self._waiting[priority] += 1
+        try:
+            while wait > 0:
+                await asyncio.sleep(wait)
+                with self._cond:
+                    wait = self._try_acquire(method, priority)
+        finally:
+            with self._cond:
+                self._waiting[priority] -= 1
+                self._record_wait(method, time.monotonic() - started)
+                self._cond.notify_all()
+
+    def _record_wait(self, method: str, seconds: float):
+        stats = self._method_stats(method)
+        stats['waits'] += 1
+        stats['wait_seconds'] += seconds
+        SLACK_WAIT_SECONDS.observe(seconds, method=method)
+
+    def retry_after(self, method: str, error: SlackApiError) -> Optional[float]:
+        """If error is a 429, pause method for its Retry-After period and return the delay."""
+        response = error.response
+        if getattr(response, 'status_code', None) != 429:
+            return None
+        headers = getattr(response, 'headers', None) or {}
+        delay = headers.get('Retry-After') or headers.get('retry-after') or 1
+        delay = float(delay[0] if isinstance(delay, list) else delay)
+        with self._cond:
+            self._blocked_until[method] = max(self._blocked_until.get(method, 0.0), time.monotonic() + delay)
+            self._method_stats(method)['rate_limited'] += 1
+            self._cond.notify_all()
+        return delay
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return queue depth per lane and per-method call, wait and 429 counters."""
+        with self._cond:
+            return {
+                'queue_depth': dict(self._waiting),
+                'methods': {method: dict(stats) for method, stats in self.stats.items()},
+            }
+
+
+def _outcome(error: SlackApiError) -> str:
+    return 'ratelimited' if getattr(error.response, 'status_code', None) == 429 else 'error'
+
+
+class ScheduledWebClient(WebClient):
+    """WebClient whose API calls go through a RequestScheduler."""
+
+    def __init__(self, *args, scheduler: RequestScheduler, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.scheduler = scheduler
+
+    def api_call(self, api_method: str, **kwargs):
+        with SLACK_REQUEST_SECONDS.time(method=api_method):
+            for attempt in range(self.scheduler.max_retries + 1):
+                self.scheduler.acquire(api_method)
+                _count_call()
+                try:
+                    response = super().api_call(api_method, **kwargs)
+                except SlackApiError as e:
+                    SLACK_REQUESTS.inc(method=api_method, outcome=_outcome(e))
+                    if attempt == self.scheduler.max_retries or self.scheduler.retry_after(api_method, e) is None:
+                        raise
+                    continue
+                SLACK_REQUESTS.inc(method=api_method, outcome='ok')
+                return response
+
+
+class ScheduledAsyncWebClient(AsyncWebClient):
+    """AsyncWebClient whose API calls go through a RequestScheduler."""
+
+    def __init__(self, *args, scheduler: RequestScheduler, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.scheduler = scheduler
+
+    async def api_call(self, api_method: str, **kwargs):
+        with SLACK_REQUEST_SECONDS.time(method=api_method):
+            for attempt in range(self.scheduler.max_retries + 1):
+                await self.scheduler.acquire_async(api_method)
+                _count_call()
+                try:
+                    response = await super().api_call(api_method, **kwargs)
+                except SlackApiError as e:
+                    SLACK_REQUESTS.inc(method=api_method, outcome=_outcome(e))
+                    if attempt == self.scheduler.max_retries or self.scheduler.retry_after(api_method, e) is None:
+                        raise
+                    continue
+                SLACK_REQUESTS.inc(method=api_method, outcome='ok')
+                return response
+
+
+# Global scheduler shared by the sync and async Slack clients
+scheduler = RequestScheduler(max_retries=int(os.getenv('SLACK_MAX_RETRIES', '3')))
@@ -0,0 +1,206 @@
+"""
+Background indexer that keeps the message store and search indexes current.
+A daemon thread round-robins over the channels the bot has joined, syncs
+each one in the scheduler's background lane within a request budget, and
+embeds and indexes the new messages in batches, so interactive searches
+read precomputed data instead of syncing and embedding on the request path.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional
+
+from ai_search import search_engine
+from message_store import message_store
+from metrics import STAGE_SECONDS
+from slack_cache import channel_directory
+from slack_pagination import PAGE_SIZES, iter_items
+from slack_scheduler import BACKGROUND, TokenBucket, count_calls, lane
+
+
+class SyncWorker:
+    """Round-robin channel sync and indexing in a daemon thread."""
+
+    def __init__(self, store, engine, interval: float = 60.0, requests_per_minute: float = 40.0,
+                 max_lag: float = 300.0, index_window: int = 100, embed_batch: int = 256,
+                 threads_per_visit: int = 5, channel_refresh: float = 600.0):
+        self.store = store
+        self.engine = engine
+        self.interval = interval
+        self.max_lag = max_lag
+        self.index_window = index_window
+        self.embed_batch = embed_batch
+        # Replies are fetched a few threads per visit so one busy channel can't hold up the rotation
+        self.threads_per_visit = threads_per_visit
+        self.channel_refresh = channel_refresh
+        # Slack calls the worker may spend per minute, on top of the scheduler's tier limits
+        self._budget = TokenBucket(requests_per_minute / 60.0, max(1.0, requests_per_minute / 4))
+        self._queue: deque = deque()
+        self._channels_at: Optional[float] = None
+        self._names: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Duration of the last complete round, i.e. how long a channel waits between visits
+        self._round_seconds = 0.0
+        # Per channel: name, synced_at (wall clock), newest stored ts, messages embedded, last error
+        self._channels: Dict[str, Dict[str, Any]] = {}
+        self.stats = {'rounds': 0, 'syncs': 0, 'errors': 0, 'api_calls': 0, 'embedded': 0, 'budget_wait_seconds': 0.0}
+
+    def start(self, client) -> Optional[threading.Thread]:
+        """Start the worker thread for client unless it is already running."""
+        if self._thread is not None:
+            return self._thread
+        self._thread = threading.Thread(target=self._run, args=(client,), name='sync-worker', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout: Optional[float] = None):
+        """Ask the worker to stop after the current channel and wait for it."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def freshness_window(self) -> float:
+        """
+        Seconds a channel counts as fresh after a visit: max_lag, or longer when a round
+        takes longer than that, so tools don't resync every channel the worker is still
+        due to revisit on a large workspace.
+        """
+        return max(self.max_lag, 1.5 * self._round_seconds)
+
+    def is_fresh(self, channel_id: str) -> bool:
+        """True when the worker synced and indexed the channel within the freshness window."""
+        if not self.is_running():
+            return False
+        window = self.freshness_window()
+        with self._lock:
+            state = self._channels.get(channel_id)
+            return state is not None and state['error'] is None and time.time() - state['synced_at'] <= window
+
+    def _run(self, client):
+        with lane(BACKGROUND):
+            while not self._stop.is_set():
+                started = time.monotonic()
+                try:
+                    self.run_round(client)
+                except Exception as e:
+                    print(f"Warning: background sync round failed: {e}", file=sys.stderr)
+                    self.stats['errors'] += 1
+                # Rounds start at most once per interval
+                self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def _joined_channels(self, client) -> List[str]:
+        with count_calls() as counter:
+            try:
+                channels = list(iter_items(
+                    client.conversations_list, "channels", PAGE_SIZES["conversations.list"],
+                    types="public_channel,private_channel", exclude_archived=True
+                ))
+            finally:
+                self._charge(counter.calls)
+        channel_directory.seed(channels)
+        joined = [channel for channel in channels if channel.get("is_member", True)]
+        self._names = {channel["id"]: channel.get("name", channel["id"]) for channel in joined}
+        return [channel["id"] for channel in joined]
+
+    def run_round(self, client):
+        """Sync and index every joined channel once, refreshing the channel list when it is stale."""
+        if self._channels_at is None or time.monotonic() - self._channels_at >= self.channel_refresh or not self._queue:
+            channel_ids = self._joined_channels(client)
+            self._channels_at = time.monotonic()
+            joined = set(channel_ids)
+            # Keep the rotation order for known channels so none is starved by a refresh
+            known = [channel_id for channel_id in self._queue if channel_id in joined]
+            new = [channel_id for channel_id in channel_ids if channel_id not in set(self._queue)]
+            self._queue = deque(known + new)
+            with self._lock:
+                for channel_id in set(self._channels) - joined:
+                    del self._channels[channel_id]
+
+        started = time.monotonic()
+        for _ in range(len(self._queue)):
+            if self._stop.is_set():
+                return
+            channel_id = self._queue.popleft()
+            self._queue.append(channel_id)
+            self._wait_for_budget()
+            self.sync_channel(client, channel_id)
+        self._round_seconds = time.monotonic() - started
+        self.stats['rounds'] += 1
+
+    def _wait_for_budget(self):
+        started = time.monotonic()
+        wait = self._budget.time_until_available(started)
+        if wait > 0:
+            self._stop.wait(wait)
+            self.stats['budget_wait_seconds'] += time.monotonic() - started
+
+    def _charge(self, calls: int):
+        """Spend budget for Slack calls the worker made."""
+        self._budget.tokens -= calls
+        self.stats['api_calls'] += calls
+
+    @STAGE_SECONDS.time(stage='background_sync')
+    def sync_channel(self, client, channel_id: str):
+        """Sync one channel, drain its pending threads and index its recent messages."""
+        error = None
+        embedded = 0
+        try:
+            # Only this worker's own requests are counted, thread reply fetches included
+            with count_calls() as counter:
+                try:
+                    self.store.sync_channel(client, channel_id, force=True, thread_limit=self.threads_per_visit)
+                finally:
+                    self._charge(counter.calls)
+            messages = self.store.get_messages(channel_id, limit=self.index_window)
+            for msg in messages:
+                msg['channel_id'] = channel_id
+            embedded = self.engine.index_messages(messages, self.embed_batch)
+        except Exception as e:
+            error = str(e)
+            self.stats['errors'] += 1
+
+        self.stats['syncs'] += 1
+        self.stats['embedded'] += embedded
+        with self._lock:
+            state = self._channels.setdefault(channel_id, {
+                'name': self._names.get(channel_id, channel_id),
+                'synced_at': 0.0, 'last_seen_ts': None, 'embedded': 0, 'error': None,
+            })
+            state['error'] = error
+            if error is None:
+                state['synced_at'] = time.time()
+                state['embedded'] += embedded
+                state['last_seen_ts'] = self.store.last_seen_ts(channel_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return worker counters and per-channel sync lag in seconds (None if never synced)."""
+        now = time.time()
+        with self._lock:
+            channels = {
+                channel_id: dict(state, lag=now - state['synced_at'] if state['synced_at'] else None)
+                for channel_id, state in self._channels.items()
+            }
+        return dict(self.stats, running=self.is_running(), queued=len(self._queue), round_seconds=self._round_seconds,
+                    freshness_window=self.freshness_window(), channels=channels)
+
+
+# Global worker; main() starts it when SLACK_SYNC_WORKER is not 0
+sync_worker = SyncWorker(
+    message_store,
+    search_engine,
+    interval=float(os.getenv('SLACK_SYNC_WORKER_INTERVAL', '60')),
+    requests_per_minute=float(os.getenv('SLACK_SYNC_WORKER_BUDGET', '40')),
+    max_lag=float(os.getenv('SLACK_SYNC_WORKER_MAX_LAG', '300')),
+    index_window=int(os.getenv('SLACK_SYNC_WORKER_WINDOW', '100')),
+    embed_batch=int(os.getenv('SLACK_SYNC_WORKER_BATCH', '256')),
+    threads_per_visit=int(os.getenv('SLACK_SYNC_WORKER_THREADS', '5')),
+)
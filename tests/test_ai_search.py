@@ -0,0 +1,45 @@
+from datetime import datetime
+
+import pytest
+
+from ai_search import parse_time_range
+
+# Sunday 18 October 2026, mid-afternoon
+NOW = datetime(2026, 10, 18, 15, 30)
+
+
+@pytest.mark.parametrize("phrase, expected", [
+    ("today", (datetime(2026, 10, 18), None)),
+    ("yesterday", (datetime(2026, 10, 17, 15, 30), None)),
+    ("last week", (datetime(2026, 10, 11, 15, 30), None)),
+    ("in the last week", (datetime(2026, 10, 11, 15, 30), None)),
+    ("this month", (datetime(2026, 10, 1), None)),
+    ("last year", (datetime(2025, 10, 18, 15, 30), None)),
+    ("this year", (datetime(2026, 1, 1), None)),
+    ("last 3 days", (datetime(2026, 10, 15, 15, 30), None)),
+    ("past 2 hours", (datetime(2026, 10, 18, 13, 30), None)),
+    ("3 days ago", (datetime(2026, 10, 15), datetime(2026, 10, 16))),
+    ("2 hours ago", (datetime(2026, 10, 18, 13, 30), datetime(2026, 10, 18, 14, 30))),
+    ("between monday and today", (datetime(2026, 10, 12), datetime(2026, 10, 19))),
+    ("from Oct 10 to Oct 25", (datetime(2026, 10, 10), datetime(2026, 10, 26))),
+    ("between 2024-05-01 and 2024-05-05", (datetime(2024, 5, 1), datetime(2024, 5, 6))),
+    ("since december", (datetime(2025, 12, 1), None)),
+    ("since 2025", (datetime(2025, 1, 1), None)),
+    ("since last friday", (datetime(2026, 10, 16), None)),
+    ("after March 1", (datetime(2026, 3, 1), None)),
+    ("before 10/20", (None, datetime(2026, 10, 20))),
+    ("until march", (None, datetime(2026, 4, 1))),
+    ("march", (datetime(2026, 3, 1), datetime(2026, 4, 1))),
+    ("october 2025", (datetime(2025, 10, 1), datetime(2025, 11, 1))),
+    ("december 1", (datetime(2025, 12, 1), datetime(2025, 12, 2))),
+    ("2024-05-01", (datetime(2024, 5, 1), datetime(2024, 5, 2))),
+    ("monday", (datetime(2026, 10, 12), datetime(2026, 10, 13))),
+    ("last friday", (datetime(2026, 10, 16), datetime(2026, 10, 17))),
+])
+def test_parse_time_range(phrase, expected):
+    assert parse_time_range(phrase, now=NOW) == expected
+
+
+@pytest.mark.parametrize("phrase", ["", "gibberish words", "messages about today"])
+def test_parse_time_range_unrecognised(phrase):
+    assert parse_time_range(phrase, now=NOW) is None
@@ -0,0 +1,40 @@
+import pytest
+
+from bm25_index import stem
+
+
+@pytest.mark.parametrize("word, expected", [
+    # Short and non-alphabetic words are left alone
+    ("api", "api"),
+    ("v2.1", "v2.1"),
+    # Plurals
+    ("issues", "issu"),
+    ("replies", "reply"),
+    ("deploys", "deploy"),
+    ("status", "status"),
+    ("class", "class"),
+    # Verb forms
+    ("deploying", "deploy"),
+    ("deployed", "deploy"),
+    ("stopped", "stop"),
+    ("released", "releas"),
+    ("releasing", "releas"),
+    ("used", "use"),
+    ("using", "use"),
+    ("doing", "do"),
+    ("agreed", "agreed"),
+    # No vowel left, so not an inflection
+    ("thing", "thing"),
+    ("bring", "bring"),
+])
+def test_stem(word, expected):
+    assert stem(word) == expected
+
+
+@pytest.mark.parametrize("forms", [
+    ("deploy", "deploys", "deployed", "deploying"),
+    ("release", "releases", "released", "releasing"),
+    ("use", "uses", "used", "using"),
+])
+def test_stem_inflections_share_a_token(forms):
+    assert len({stem(form) for form in forms}) == 1
@@ -0,0 +1,54 @@
+import pytest
+
+from message_store import MessageStore
+
+MESSAGES = {
+    "C1": [
+        {"ts": "100.000001", "text": "Deploying the API to production"},
+        {"ts": "100.000002", "text": "redeploy finished, dns looks fine"},
+        {"ts": "100.000003", "text": "Lunch at noon?"},
+        {"ts": "100.000004", "text": "prod deploy rolled back: 50% errors"},
+    ],
+    "C2": [
+        {"ts": "100.000005", "text": "DNS outage in us-east"},
+        {"ts": "100.000006", "text": "the deploy is done"},
+    ],
+}
+
+
+@pytest.fixture
+def store():
+    store = MessageStore(":memory:")
+    for channel_id, messages in MESSAGES.items():
+        store.add_messages(channel_id, messages)
+    return store
+
+
+@pytest.mark.parametrize("query, channel_ids, expected", [
+    # Newest first, case-insensitive, across channels
+    ("dns", None, ["100.000005", "100.000002"]),
+    # A lone token matches anywhere in a word
+    ("deploy", None, ["100.000006", "100.000004", "100.000002", "100.000001"]),
+    ("ploy", None, ["100.000006", "100.000004", "100.000002", "100.000001"]),
+    ("us", None, ["100.000005"]),
+    # Word prefixes and phrases
+    ("prod", None, ["100.000004", "100.000001"]),
+    ("the api to prod", None, ["100.000001"]),
+    ("deploy rolled", None, ["100.000004"]),
+    ("redeploy fin", None, ["100.000002"]),
+    # Punctuation in the query must match exactly
+    ("50% errors", None, ["100.000004"]),
+    ("?", None, ["100.000003"]),
+    # Channel filters
+    ("deploy", ["C2"], ["100.000006"]),
+    ("dns", [], []),
+    ("missing", None, []),
+])
+def test_search(store, query, channel_ids, expected):
+    results = store.search(query, channel_ids=channel_ids)
+    assert [msg["ts"] for msg in results] == expected
+
+
+def test_search_limit_and_channel_tag(store):
+    results = store.search("deploy", limit=2)
+    assert [(msg["channel_id"], msg["ts"]) for msg in results] == [("C2", "100.000006"), ("C1", "100.000004")]